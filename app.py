@@ -5,6 +5,7 @@ from config import Config
 from routes.auth_routes import auth_bp
 from routes.user_routes import user_bp
 from routes.template_route import template_bp
+from routes.metrics_routes import metrics_bp
 from scanner.port_scanner import scanner_bp
 from extension import db, bcrypt, mail, jwt, limiter, jwt_blacklist
 
@@ -23,6 +24,7 @@ app.register_blueprint(auth_bp, url_prefix="/api/auth")
 app.register_blueprint(user_bp, url_prefix='/api/user')
 app.register_blueprint(template_bp, url_prefix='/')
 app.register_blueprint(scanner_bp)
+app.register_blueprint(metrics_bp)
 
 @app.errorhandler(RateLimitExceeded)
 def handle_limit(e):
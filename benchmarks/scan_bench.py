@@ -0,0 +1,354 @@
+"""Scanner throughput benchmark: every mode x traversal against a loopback fake-service farm
+
+Usage: python benchmarks/scan_bench.py [--ports 20000-21999] [--modes tcp,async,sharded,syn]
+                                       [--traversals bfs,dfs,adaptive] [--output bench.json]
+
+The farm runs in its own process. Some ports answer with SSH/FTP/SMTP/HTTP banners from
+SERVICE_FINGERPRINTS, some accept and stay silent, and some drop SYNs (a full accept queue),
+which looks like a filtered port. Every combination is scanned in a fresh interpreter,
+so caches, pacer buckets and peak RSS do not leak between runs. One JSON object per run
+is printed, and --output writes them all together with the farm layout for regression
+tracking.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Banner yang dikirim farm, semuanya dikenali oleh SERVICE_FINGERPRINTS
+BANNERS = [
+    ('ssh', b'SSH-2.0-OpenSSH_8.9p1 Ubuntu-3ubuntu0.4\r\n'),
+    ('ftp', b'220 ProFTPD 1.3.5e Server ready.\r\n'),
+    ('smtp', b'220 mail.example.com ESMTP Postfix (Ubuntu)\r\n'),
+    ('http', None),
+]
+HTTP_RESPONSE = b'HTTP/1.1 200 OK\r\nServer: nginx/1.18.0\r\nContent-Length: 0\r\n\r\n'
+
+# Interval sampling FD selama scan (detik)
+SAMPLE_INTERVAL = 0.01
+
+
+def plan_farm(start_port, end_port, banner_count, silent_count, drop_count, seed):
+    """{kind: [ports]} picked deterministically from the scanned range"""
+    rng = random.Random(seed)
+    total = banner_count + silent_count + drop_count
+    ports = rng.sample(range(start_port, end_port + 1), min(total, end_port - start_port + 1))
+    return {
+        "banner": sorted(ports[:banner_count]),
+        "silent": sorted(ports[banner_count:banner_count + silent_count]),
+        "drop": sorted(ports[banner_count + silent_count:])
+    }
+
+
+async def _serve_farm(layout, ready):
+    bound = {"banner": [], "silent": [], "drop": []}
+    held = []
+
+    def banner_handler(banner):
+        async def handle(reader, writer):
+            try:
+                if banner:
+                    writer.write(banner)
+                    await writer.drain()
+                else:
+                    # HTTP baru menjawab setelah ada request
+                    if await reader.read(1024):
+                        writer.write(HTTP_RESPONSE)
+                        await writer.drain()
+                await reader.read(1024)
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+        return handle
+
+    async def silent_handler(reader, writer):
+        try:
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    for index, port in enumerate(layout["banner"]):
+        _, banner = BANNERS[index % len(BANNERS)]
+        try:
+            held.append(await asyncio.start_server(banner_handler(banner), '127.0.0.1', port))
+            bound["banner"].append(port)
+        except OSError:
+            continue
+    for port in layout["silent"]:
+        try:
+            held.append(await asyncio.start_server(silent_handler, '127.0.0.1', port))
+            bound["silent"].append(port)
+        except OSError:
+            continue
+    for port in layout["drop"]:
+        # Backlog 0 yang sudah diisi satu koneksi: SYN berikutnya dibuang kernel
+        listener = socket.socket()
+        try:
+            listener.bind(('127.0.0.1', port))
+        except OSError:
+            listener.close()
+            continue
+        listener.listen(0)
+        filler = socket.create_connection(('127.0.0.1', port))
+        held.extend([listener, filler])
+        bound["drop"].append(port)
+
+    ready.put(bound)
+    await asyncio.Event().wait()
+
+
+def _farm_main(layout, ready):
+    asyncio.run(_serve_farm(layout, ready))
+
+
+def start_farm(layout):
+    """Start the farm process, returns (process, ports actually bound per kind)"""
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    process = context.Process(target=_farm_main, args=(layout, ready), daemon=True)
+    process.start()
+    return process, ready.get(timeout=30)
+
+
+def _fd_count(pid='self'):
+    try:
+        return len(os.listdir(f'/proc/{pid}/fd'))
+    except OSError:
+        return 0
+
+
+def _child_pids():
+    pids = []
+    try:
+        for task in os.listdir('/proc/self/task'):
+            with open(f'/proc/self/task/{task}/children') as f:
+                pids.extend(f.read().split())
+    except OSError:
+        pass
+    return pids
+
+
+def _rss_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() // 1024
+
+
+def _percentile_ms(samples, percentile):
+    if len(samples) < 2:
+        return None
+    return round(statistics.quantiles(samples, n=100)[percentile - 1] * 1000, 3)
+
+
+def run_one(spec):
+    """Scan the farm once in this process and return the measurements"""
+    os.environ['SCAN_CHECKPOINT_DIR'] = tempfile.mkdtemp(prefix='scan-bench-')
+    from scanner import port_scanner
+    from scanner.pacing import Pacer
+    from scanner.progress import ScanProgress
+    from scanner.targets import TargetScheduler
+
+    if spec["pacer_rate"]:
+        port_scanner.PACER = Pacer(spec["pacer_rate"], spec["pacer_rate"])
+
+    latencies = []
+    untimed = []
+
+    class TimedScheduler(TargetScheduler):
+        """Records dispatch-to-finish latency of every probe handed out by next_probe"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.sent = {}
+
+        def next_probe(self):
+            probe = super().next_probe()
+            if probe is not None:
+                self.sent[probe] = time.monotonic()
+            return probe
+
+        def finish(self, ip, port, port_info=None):
+            # Port terbuka selesai setelah fingerprint, bukan saat slot connect dilepas
+            sent = self.sent.pop((ip, port), None)
+            if sent is not None:
+                latencies.append(time.monotonic() - sent)
+            super().finish(ip, port, port_info)
+
+        def shard(self, count):
+            # Probe berjalan di proses shard, latensinya tidak terlihat dari sini
+            untimed.append("sharded")
+            return super().shard(count)
+
+        def drain(self):
+            # Mode raw: done() dipanggil saat paket dikirim, bukan saat dijawab
+            untimed.append("drain")
+            return super().drain()
+
+    port_scanner.TargetScheduler = TimedScheduler
+
+    config, error = port_scanner.parse_scan_request({
+        "ip": "127.0.0.1",
+        "start_port": spec["start_port"],
+        "end_port": spec["end_port"],
+        "mode": spec["mode"],
+        "traversal": spec["traversal"],
+        "fingerprint": spec["fingerprint"],
+        "threads": spec["threads"],
+        "concurrency": spec["concurrency"],
+        "processes": spec["processes"],
+        "discovery": False
+    })
+    if error:
+        return {"mode": spec["mode"], "traversal": spec["traversal"], "error": error}
+
+    progress = ScanProgress(port_scanner.count_scan_ports(config))
+    first_open = []
+    progress.add_listener(lambda ip, port_info: first_open.append(time.monotonic()))
+
+    fd_baseline = _fd_count()
+    rss_baseline = _rss_kb()
+    fd_peak = [fd_baseline]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(SAMPLE_INTERVAL):
+            count = _fd_count() + sum(_fd_count(pid) for pid in _child_pids())
+            fd_peak[0] = max(fd_peak[0], count)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    started = time.monotonic()
+    result = port_scanner.execute_scan(config, f"bench-{spec['mode']}-{spec['traversal']}", progress)
+    elapsed = time.monotonic() - started
+    stop.set()
+    sampler.join()
+
+    expected_open = set(spec["expected_open"])
+    found_open = set(result["open_ports"])
+    timed = not untimed
+    return {
+        "mode": spec["mode"],
+        "traversal": spec["traversal"],
+        "engine": result["engine"],
+        "fingerprint": spec["fingerprint"],
+        "ports": result["total_ports_scanned"],
+        "duration_s": round(elapsed, 3),
+        "ports_per_sec": round(result["total_ports_scanned"] / elapsed, 1) if elapsed else None,
+        "time_to_first_open_s": round(min(first_open) - started, 4) if first_open else None,
+        "latency_p50_ms": _percentile_ms(latencies, 50) if timed else None,
+        "latency_p99_ms": _percentile_ms(latencies, 99) if timed else None,
+        "latency_samples": len(latencies) if timed else 0,
+        "open_found": len(found_open),
+        "open_expected": len(expected_open),
+        "open_missed": len(expected_open - found_open),
+        "retried_ports": result["timing"]["retried_ports"] if result["timing"] else None,
+        "concurrency_peak": (result["concurrency_control"] or {}).get("peak"),
+        "fd_baseline": fd_baseline,
+        "fd_peak": fd_peak[0],
+        "rss_baseline_kb": rss_baseline,
+        "rss_peak_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "child_rss_peak_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss or None
+    }
+
+
+def run_isolated(spec):
+    """run_one in a fresh interpreter, so no state or RSS carries over between runs"""
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-one', json.dumps(spec)],
+                               capture_output=True, text=True, cwd=ROOT)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode or not lines:
+        return {"mode": spec["mode"], "traversal": spec["traversal"],
+                "error": completed.stderr.strip().splitlines()[-1:] or "no output"}
+    return json.loads(lines[-1])
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=ROOT, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ports', default='20000-21999', help='scanned range, farm ports are picked from it')
+    parser.add_argument('--modes', default='tcp,async,sharded,syn')
+    parser.add_argument('--traversals', default='bfs,dfs,adaptive')
+    parser.add_argument('--banner-ports', type=int, default=40)
+    parser.add_argument('--silent-ports', type=int, default=10)
+    parser.add_argument('--drop-ports', type=int, default=10)
+    parser.add_argument('--no-fingerprint', action='store_true')
+    parser.add_argument('--threads', type=int, default=None, help='fixed ceiling, default auto-tuned')
+    parser.add_argument('--concurrency', type=int, default=None, help='fixed ceiling, default auto-tuned')
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--pacer-rate', type=int, default=None,
+                        help='replace the global/per-target pacer limits (probes/sec) for the runs')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write all runs plus farm layout as one JSON document')
+    parser.add_argument('--run-one', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(json.loads(args.run_one))))
+        return
+
+    start_port, end_port = (int(port) for port in args.ports.split('-'))
+    layout = plan_farm(start_port, end_port, args.banner_ports, args.silent_ports,
+                       args.drop_ports, args.seed)
+    farm, bound = start_farm(layout)
+    results = []
+    try:
+        for mode in args.modes.split(','):
+            for traversal in args.traversals.split(','):
+                row = run_isolated({
+                    "mode": mode,
+                    "traversal": traversal,
+                    "start_port": start_port,
+                    "end_port": end_port,
+                    "fingerprint": not args.no_fingerprint,
+                    "threads": args.threads,
+                    "concurrency": args.concurrency,
+                    "processes": args.processes,
+                    "pacer_rate": args.pacer_rate,
+                    "expected_open": bound["banner"] + bound["silent"]
+                })
+                results.append(row)
+                print(json.dumps(row), flush=True)
+    finally:
+        farm.terminate()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "ports": args.ports,
+                "farm": {kind: len(ports) for kind, ports in bound.items()},
+                "pacer_rate": args.pacer_rate,
+                "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                "results": results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
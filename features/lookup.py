@@ -1,23 +1,24 @@
-import socket
 import whois
 import requests
 
+from utils.resolver import RESOLVER
+
 def get_domain_ip_info(input_value):
     info = {}
-    try:
-        # Domain → IP
-        ip = socket.gethostbyname(input_value)
+    # Domain → IP (semua record A/AAAA, di-cache sesuai TTL)
+    addresses = RESOLVER.resolve(input_value)
+    if addresses and addresses["ipv4"]:
         info["domain"] = input_value
-        info["ip"] = ip
-    except socket.gaierror:
-        try:
-            # IP → Domain
-            domain = socket.gethostbyaddr(input_value)[0]
-            info["domain"] = domain
-            info["ip"] = input_value
-        except socket.herror:
+        info["ip"] = addresses["ipv4"][0]
+        info["addresses"] = addresses
+    else:
+        # IP → Domain
+        domain = RESOLVER.reverse(input_value)
+        if not domain:
             info["error"] = "Invalid input"
             return info
+        info["domain"] = domain
+        info["ip"] = input_value
 
     # WHOIS
     try:
@@ -1,6 +1,10 @@
 from extension import db, bcrypt
+from utils.metrics import REGISTRY, DURATION_BUCKETS
 import datetime
 
+PASSWORD_HASH_SECONDS = REGISTRY.histogram("sena_password_hash_seconds",
+                                           "bcrypt time per password hash or check", DURATION_BUCKETS)
+
 class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
@@ -12,10 +16,12 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     
     def set_password(self, raw_password, rounds=12):
-        self.password = bcrypt.generate_password_hash(raw_password, rounds=rounds).decode('utf-8')
+        with PASSWORD_HASH_SECONDS.time(operation="hash"):
+            self.password = bcrypt.generate_password_hash(raw_password, rounds=rounds).decode('utf-8')
         
     def check_password(self, raw_password):
-        return bcrypt.check_password_hash(self.password, raw_password)
+        with PASSWORD_HASH_SECONDS.time(operation="check"):
+            return bcrypt.check_password_hash(self.password, raw_password)
     
     def __repr__(self):
         return f"<User {self.username}>"
\ No newline at end of file
@@ -0,0 +1,11 @@
+from flask import Blueprint, Response
+from extension import limiter
+from utils.metrics import REGISTRY
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics')
+@limiter.exempt
+def metrics():
+    """Prometheus text exposition of the process metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,181 @@
+import asyncio
+import errno
+import socket
+import time
+
+from .services import open_port_info, describe_banner
+from .probes import PROBE_DB, probe_payload
+from .timing import CONNECT_TIMEOUT, BANNER_TIMEOUT
+from .concurrency import RESOURCE_ERRNOS, FD_BUDGET
+from .pipeline import FingerprintPipeline
+
+# Batas koneksi yang sedang berjalan untuk mode async
+ASYNC_MAX_CONCURRENCY = 5000
+
+def clamp_concurrency(concurrency):
+    """Clamp requested concurrency to the ceiling and the process FD budget"""
+    return max(1, min(int(concurrency), ASYNC_MAX_CONCURRENCY, FD_BUDGET.total))
+
+
+async def _recv(loop, sock, timeout):
+    """Reply to a probe: bytes, b'' when the peer closed, None on timeout"""
+    try:
+        return await asyncio.wait_for(loop.sock_recv(sock, 1024), timeout)
+    except asyncio.TimeoutError:
+        return None
+    except OSError:
+        return b''
+
+
+async def probe_service_async(loop, sock, target_ip, port, timeout=BANNER_TIMEOUT):
+    """Walk the port's probe plan on a connected non-blocking socket: (banner, (service, info) or None)"""
+    banner = None
+    for probe in PROBE_DB.plan(port):
+        payload = probe_payload(probe, target_ip)
+        if payload:
+            try:
+                await loop.sock_sendall(sock, payload)
+            except OSError:
+                break
+        response = await _recv(loop, sock, timeout)
+        if response is None:
+            continue
+        if not response:
+            # Service menutup koneksi, probe berikutnya tidak akan terbaca
+            break
+        matched = PROBE_DB.match(probe, response, port)
+        if matched:
+            return response, matched
+        banner = banner or response
+    return banner, None
+
+
+async def connect_port(loop, target_ip, port, timing=None, delay=0):
+    """Discovery stage: non-blocking connect, returns the connected socket or None"""
+    if delay > 0:
+        # Slot dari pacer global belum tiba
+        await asyncio.sleep(delay)
+    timeout = timing.connect_timeout() if timing else CONNECT_TIMEOUT
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    except OSError as e:
+        # Kehabisan FD bukan berarti port tertutup, probe diulang di pass retry
+        if timing and e.errno in RESOURCE_ERRNOS:
+            timing.record_resource_error(port)
+            return None
+        raise
+    sock.setblocking(False)
+    try:
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (target_ip, port)), timeout)
+        except asyncio.TimeoutError:
+            if timing:
+                timing.record_timeout(port)
+            sock.close()
+            return None
+        except OSError as e:
+            if timing and e.errno == errno.ECONNREFUSED:
+                timing.observe(time.monotonic() - started, refused=True)
+            elif timing and e.errno in RESOURCE_ERRNOS:
+                timing.record_resource_error(port)
+            sock.close()
+            return None
+    except BaseException:
+        sock.close()
+        raise
+    if timing:
+        timing.observe(time.monotonic() - started)
+    return sock
+
+
+async def fingerprint_port(loop, sock, target_ip, port, timing=None):
+    """Fingerprint stage: banner-grab on the socket connect_port opened, then close it"""
+    port_info = open_port_info(port)
+    try:
+        banner_timeout = timing.banner_timeout() if timing else BANNER_TIMEOUT
+        banner_started = time.monotonic()
+        banner, matched = await probe_service_async(loop, sock, target_ip, port, banner_timeout)
+        if timing:
+            timing.observe_banner(time.monotonic() - banner_started)
+        if banner:
+            describe_banner(port_info, banner, matched)
+        else:
+            port_info["banner"] = "No banner"
+        return port_info
+    finally:
+        sock.close()
+
+
+async def _scan_probes(scheduler, fingerprint_enabled, timings, pipeline):
+    loop = asyncio.get_running_loop()
+    results = []
+    wake = asyncio.Event()
+    # Banner worker dibatasi terpisah dari jendela connect
+    fingerprint_slots = asyncio.Semaphore(pipeline.workers)
+    in_flight = 0
+
+    async def fingerprint(sock, ip, port):
+        async with fingerprint_slots:
+            return await fingerprint_port(loop, sock, ip, port, timings.get(ip))
+
+    def on_fingerprinted(task, ip, port):
+        pipeline.complete()
+        # Port tetap terbuka walau banner gagal dibaca (fingerprint_port sudah menutup socket)
+        port_info = open_port_info(port) if task.cancelled() or task.exception() else task.result()
+        scheduler.finish(ip, port, port_info)
+        results.append((ip, port_info))
+        wake.set()
+
+    def on_connected(task, ip, port):
+        nonlocal in_flight
+        in_flight -= 1
+        wake.set()
+        # Task yang dibatalkan atau gagal dihitung seperti port yang tidak menjawab
+        sock = None if task.cancelled() or task.exception() else task.result()
+        if sock is None:
+            scheduler.done(ip, port)
+            return
+        # Slot connect langsung bebas, port terbuka mengalir ke tahap fingerprint
+        port_info = open_port_info(port)
+        scheduler.release(ip, port_info)
+        if not fingerprint_enabled:
+            sock.close()
+            scheduler.finish(ip, port, port_info)
+            results.append((ip, port_info))
+            return
+        pipeline.hand_off()
+        fingerprint_task = loop.create_task(fingerprint(sock, ip, port))
+        fingerprint_task.add_done_callback(lambda t, ip=ip, port=port: on_fingerprinted(t, ip, port))
+
+    while True:
+        # Isi slot kosong dengan probe berikutnya dari scheduler
+        while in_flight < scheduler.concurrency:
+            if not pipeline.admits(in_flight, scheduler.concurrency):
+                # Banner lambat menahan sapuan, bukan menumpuk socket terbuka tanpa batas
+                pipeline.stall()
+                break
+            probe = scheduler.next_probe()
+            if probe is None:
+                break
+            ip, port = probe
+            task = loop.create_task(connect_port(loop, ip, port, timings.get(ip), scheduler.pace(ip)))
+            task.add_done_callback(lambda t, ip=ip, port=port: on_connected(t, ip, port))
+            in_flight += 1
+
+        if in_flight == 0 and pipeline.pending == 0:
+            break
+        wake.clear()
+        await wake.wait()
+
+    return results
+
+
+def run_async_scan(scheduler, fingerprint_enabled=False, timings=None):
+    """Scan (ip, port) probes with thousands of in-flight connects on a single event loop"""
+    pipeline = scheduler.pipeline or FingerprintPipeline.event_loop()
+    try:
+        return asyncio.run(_scan_probes(scheduler, fingerprint_enabled, timings or {}, pipeline))
+    finally:
+        if pipeline is not scheduler.pipeline:
+            pipeline.close()
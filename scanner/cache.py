@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .port_state import PortStateMap, UNPROBED
+
+# Hasil port lebih tua dari ini tidak pernah dipakai lagi (detik)
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', 3600))
+# Batas jumlah port yang disimpan (2 bit per port, ~500 KiB), host yang paling lama tidak dipakai dibuang dulu
+RESULT_CACHE_MAX_PORTS = int(os.getenv('RESULT_CACHE_MAX_PORTS', 2000000))
+
+
+class ResultCache:
+    """LRU of per-port results keyed by (resolved_ip, mode, fingerprint), expiring after ttl"""
+
+    def __init__(self, ttl=RESULT_CACHE_TTL, max_ports=RESULT_CACHE_MAX_PORTS):
+        self.ttl = ttl
+        self.max_ports = max_ports
+        # (ip, mode, fingerprint) -> [(checked_at, PortStateMap, {port: port_info} port terbuka)],
+        # terbaru di belakang; satu entri per scan, bukan satu dict per port
+        self.hosts = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _expire(self, batches, now):
+        for batch in [batch for batch in batches if now - batch[0] > self.ttl]:
+            batches.remove(batch)
+            self.size -= batch[1].probed_count()
+
+    def lookup(self, ip, mode, fingerprint, start_port, end_port, max_age):
+        """(PortStateMap, {port: port_info}) of ports in range checked within max_age seconds"""
+        key = (ip, mode, bool(fingerprint))
+        now = time.time()
+        max_age = min(max_age, self.ttl)
+        fresh = PortStateMap(start_port, end_port)
+        details = {}
+        with self.lock:
+            batches = self.hosts.get(key)
+            if batches is not None:
+                self.hosts.move_to_end(key)
+                self._expire(batches, now)
+                # Port yang sama tidak pernah ada di dua batch, store() menghapusnya dari batch lama
+                for checked_at, states, open_ports in batches:
+                    if now - checked_at > max_age:
+                        continue
+                    for port, state in states.ports(start_port=start_port, end_port=end_port):
+                        fresh.set(port, state)
+                    details.update((port, port_info) for port, port_info in open_ports.items()
+                                   if start_port <= port <= end_port)
+            hits = fresh.probed_count()
+            self.hits += hits
+            self.misses += max(0, end_port - start_port + 1) - hits
+        return fresh, details
+
+    def store(self, ip, mode, fingerprint, states, details, checked_at=None):
+        """Remember a PortStateMap plus open port details probed at checked_at (default now)"""
+        key = (ip, mode, bool(fingerprint))
+        checked_at = checked_at or time.time()
+        if not states.probed_count():
+            return
+        with self.lock:
+            batches = self.hosts.setdefault(key, [])
+            self.hosts.move_to_end(key)
+            # Hasil baru menggantikan hasil lama untuk port yang sama
+            for index, (old_at, old_states, old_details) in enumerate(batches):
+                before = old_states.probed_count()
+                old_states.forget(states)
+                self.size -= before - old_states.probed_count()
+                batches[index] = (old_at, old_states,
+                                  {port: info for port, info in old_details.items()
+                                   if old_states.get(port) != UNPROBED})
+            batches[:] = [batch for batch in batches if batch[1].probed_count()]
+            batches.append((checked_at, states, dict(details)))
+            self.size += states.probed_count()
+            while self.size > self.max_ports and len(self.hosts) > 1:
+                _, evicted = self.hosts.popitem(last=False)
+                self.size -= sum(batch[1].probed_count() for batch in evicted)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hosts": len(self.hosts),
+                "ports": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "ttl": self.ttl
+            }
+
+
+RESULT_CACHE = ResultCache()
@@ -0,0 +1,197 @@
+import base64
+import json
+import os
+import threading
+import time
+import zlib
+
+from .port_state import PortStateMap, UNPROBED, CLOSED, FILTERED, OPEN
+
+# Lokasi file checkpoint, satu file JSON per scan
+CHECKPOINT_DIR = os.getenv('SCAN_CHECKPOINT_DIR', 'scan_checkpoints')
+# Jeda minimum antar penulisan checkpoint (detik)
+CHECKPOINT_INTERVAL = 5.0
+# Checkpoint yang tidak ditulis ulang selama ini dianggap ditinggalkan (detik, default 7 hari)
+CHECKPOINT_MAX_AGE = float(os.getenv('SCAN_CHECKPOINT_MAX_AGE', 7 * 24 * 3600))
+
+
+def _checkpoint_path(scan_id):
+    # scan_id berasal dari URL, hanya karakter aman yang dipakai untuk nama file
+    safe_id = ''.join(c for c in scan_id if c.isalnum() or c in '-_')
+    return os.path.join(CHECKPOINT_DIR, f"{safe_id}.json")
+
+
+def _pack_bitmap(bitmap):
+    return base64.b64encode(zlib.compress(bytes(bitmap))).decode('ascii')
+
+
+def _unpack_bitmap(data):
+    return bytearray(zlib.decompress(base64.b64decode(data)))
+
+
+class ScanCheckpoint:
+    """Per-host port state map plus details of the open ports found so far, saved periodically to disk"""
+
+    def __init__(self, scan_id, config):
+        self.scan_id = scan_id
+        self.config = config
+        self.start_port = config["start_port"]
+        # 2 bit per port (belum/closed/filtered/open), detail hanya untuk port terbuka
+        self.states = {ip: PortStateMap(self.start_port, config["end_port"]) for _, ip in config["targets"]}
+        self.done_count = {ip: 0 for _, ip in config["targets"]}
+        self.results = {ip: {} for _, ip in config["targets"]}
+        self.saved_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def is_done(self, ip, port):
+        return self.states[ip].get(port) != UNPROBED
+
+    def mark(self, ip, port, port_info=None, state=None):
+        """Record a finished probe, saving to disk at most every CHECKPOINT_INTERVAL"""
+        if state is None:
+            state = OPEN if port_info else CLOSED
+        with self.lock:
+            if self.states[ip].set(port, state) == UNPROBED:
+                self.done_count[ip] += 1
+            if port_info:
+                self.results[ip][port] = port_info
+        if time.monotonic() - self.saved_at >= CHECKPOINT_INTERVAL:
+            self.save()
+
+    def add_result(self, ip, port_info):
+        """Open port confirmed by a raw scanner (SYN/UDP) after the sweep"""
+        with self.lock:
+            if self.states[ip].set(port_info["port"], OPEN) == UNPROBED:
+                self.done_count[ip] += 1
+            self.results[ip][port_info["port"]] = port_info
+
+    def mark_states(self, ip, states):
+        """Closed and filtered ports of a raw scanner's PortStateMap; open ones arrive via add_result"""
+        with self.lock:
+            host_states = self.states[ip]
+            for port, state in states.ports(start_port=self.start_port, end_port=self.config["end_port"]):
+                if state != OPEN and host_states.set(port, state) == UNPROBED:
+                    self.done_count[ip] += 1
+
+    def mark_filtered(self, ip, ports):
+        """Probes that stayed unanswered after every retry"""
+        with self.lock:
+            for port in ports:
+                if self.states[ip].set(port, FILTERED) == UNPROBED:
+                    self.done_count[ip] += 1
+
+    def counts(self, ip):
+        """{"closed": n, "filtered": n, "open": n} for ip"""
+        with self.lock:
+            return self.states[ip].counts()
+
+    def covers(self, ip, port):
+        """True when port is in the scan range and its probe has finished"""
+        if not self.start_port <= port <= self.config["end_port"]:
+            return False
+        return self.is_done(ip, port)
+
+    def remaining(self, ip, ports):
+        """Filter a host's port order down to the ports not probed yet"""
+        for port in ports:
+            if not self.is_done(ip, port):
+                yield port
+
+    def snapshot_done(self):
+        """Copy of every state map, to tell later which probes ran after this point"""
+        with self.lock:
+            return {ip: states.copy() for ip, states in self.states.items()}
+
+    def probed_since(self, ip, before):
+        """(PortStateMap, {port: port_info}) of probes of ip finished after snapshot_done()"""
+        with self.lock:
+            states = self.states[ip].copy()
+            states.forget(before[ip])
+            details = {port: port_info for port, port_info in self.results[ip].items()
+                       if states.get(port) == OPEN}
+            return states, details
+
+    def found_results(self):
+        """[(ip, port_info)] for every open port recorded so far"""
+        with self.lock:
+            return [(ip, port_info) for ip, ports in self.results.items()
+                    for port_info in ports.values()]
+
+    @property
+    def ports_done(self):
+        return sum(self.done_count.values())
+
+    def save(self):
+        with self.lock:
+            state = {
+                "scan_id": self.scan_id,
+                "config": self.config,
+                "hosts": {ip: {
+                    "states": _pack_bitmap(self.states[ip].data),
+                    "results": list(self.results[ip].values())
+                } for ip in self.states},
+                "saved_at": time.time()
+            }
+            self.saved_at = time.monotonic()
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        path = _checkpoint_path(self.scan_id)
+        # Tulis ke file sementara lalu rename, checkpoint lama tidak pernah setengah tertulis
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(temp_path, path)
+
+    def remove(self):
+        try:
+            os.remove(_checkpoint_path(self.scan_id))
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def load(cls, scan_id):
+        """Checkpoint saved for scan_id, or None when there is nothing to resume"""
+        try:
+            with open(_checkpoint_path(scan_id)) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        config = state["config"]
+        config["targets"] = [tuple(target) for target in config["targets"]]
+        checkpoint = cls(scan_id, config)
+        for ip, host in state["hosts"].items():
+            if ip not in checkpoint.states:
+                continue
+            states = checkpoint.states[ip]
+            states.data = _unpack_bitmap(host["states"])
+            checkpoint.results[ip] = {info["port"]: info for info in host["results"]}
+            for port in checkpoint.results[ip]:
+                states.set(port, OPEN)
+            checkpoint.done_count[ip] = states.probed_count()
+        return checkpoint
+
+
+def checkpoint_exists(scan_id):
+    return os.path.exists(_checkpoint_path(scan_id))
+
+
+def prune_checkpoints(max_age=CHECKPOINT_MAX_AGE):
+    """Delete checkpoint files not written for max_age seconds, returns how many were removed"""
+    try:
+        names = os.listdir(CHECKPOINT_DIR)
+    except FileNotFoundError:
+        return 0
+    # Scan yang masih berjalan menulis ulang checkpoint-nya tiap CHECKPOINT_INTERVAL
+    cutoff = time.time() - max_age
+    removed = 0
+    for name in names:
+        if not name.endswith(('.json', '.tmp')):
+            continue
+        path = os.path.join(CHECKPOINT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
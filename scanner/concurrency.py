@@ -0,0 +1,217 @@
+import errno
+import resource
+import threading
+
+from utils.metrics import REGISTRY
+
+# File descriptors kept free for Flask, logging and the database
+FD_RESERVE = 64
+# Dipakai kalau RLIMIT_NOFILE tidak terbatas
+UNLIMITED_FD_BUDGET = 65536
+
+# Batas bawah dan awal jendela probe in-flight per scan
+MIN_CONCURRENCY = 8
+THREADED_INITIAL_CONCURRENCY = 32
+THREADED_MAX_CONCURRENCY = 256
+ASYNC_INITIAL_CONCURRENCY = 128
+
+# Kenaikan aditif per jendela setelah keluar dari slow start
+ADDITIVE_STEP = 16
+# Jendela tanpa kenaikan kalau terlalu banyak respons yang lambat
+FAST_RESPONSE_RATIO = 0.9
+# Lebih dari ini probe timeout dalam satu jendela = kongesti
+TIMEOUT_BACKOFF_RATIO = 0.1
+# Lonjakan porsi RST dibanding rata-rata sebelumnya = target mulai menolak semuanya
+REFUSED_STORM_JUMP = 0.3
+REFUSED_EWMA_WEIGHT = 0.25
+
+# Error lokal yang berarti proses kehabisan socket/buffer, bukan jawaban target
+RESOURCE_ERRNOS = frozenset((errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM, errno.EADDRNOTAVAIL))
+
+
+def _fd_limit():
+    soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit == resource.RLIM_INFINITY:
+        return UNLIMITED_FD_BUDGET
+    return soft_limit
+
+
+class FdBudget:
+    """Process-wide pool of sockets every running scan leases its concurrency from"""
+
+    def __init__(self, reserve=FD_RESERVE):
+        self.total = max(1, _fd_limit() - reserve)
+        self.leased = 0
+        self.lock = threading.Lock()
+
+    def lease(self, wanted):
+        """Grant up to wanted descriptors, fewer (or none) when other scans hold the rest"""
+        with self.lock:
+            granted = max(0, min(wanted, self.total - self.leased))
+            self.leased += granted
+            return granted
+
+    def release(self, count):
+        with self.lock:
+            self.leased = max(0, self.leased - count)
+
+    def snapshot(self):
+        with self.lock:
+            return {"total": self.total, "leased": self.leased}
+
+
+FD_BUDGET = FdBudget()
+
+REGISTRY.gauge("sena_fd_budget_total", "Socket descriptors scans may use in this process",
+               lambda: FD_BUDGET.snapshot()["total"])
+REGISTRY.gauge("sena_fd_budget_leased", "Socket descriptors currently leased by running scans",
+               lambda: FD_BUDGET.snapshot()["leased"])
+
+
+class ConcurrencyController:
+    """AIMD window of in-flight probes for one scan, bounded by the shared FD budget
+
+    Slow start doubles the window every window of fast answers, then grows it additively.
+    A window with too many timeouts or a sudden RST storm halves it, and a local resource
+    error (EMFILE, ENOBUFS, ...) halves it immediately.
+    """
+
+    def __init__(self, initial, ceiling, floor=MIN_CONCURRENCY, budget=FD_BUDGET):
+        self.budget = budget
+        self.ceiling = max(1, int(ceiling))
+        self.floor = max(1, min(int(floor), self.ceiling))
+        self.initial = max(self.floor, min(int(initial), self.ceiling))
+        self.leased = 0
+        self.limit = 0
+        # Slow start sampai kongesti pertama
+        self.ssthresh = self.ceiling
+        self.peak = 0
+        self.increases = 0
+        self.decreases = {}
+        self.refused_ewma = None
+        # Error lokal beruntun dari probe yang sama-sama gagal hanya memotong jendela sekali
+        self.backed_off = False
+        self.lock = threading.Lock()
+        self._reset_window()
+        with self.lock:
+            self._resize(self.initial)
+
+    def _reset_window(self):
+        self.window_events = 0
+        self.window_fast = 0
+        self.window_responses = 0
+        self.window_refused = 0
+        self.window_timeouts = 0
+
+    def _resize(self, target):
+        """Move the window to target, leasing or returning descriptors; caller holds lock"""
+        target = max(self.floor, min(target, self.ceiling))
+        if target > self.leased:
+            self.leased += self.budget.lease(target - self.leased)
+        elif target < self.leased:
+            self.budget.release(self.leased - target)
+            self.leased = target
+        # Scan selalu boleh jalan dengan satu socket walau budget sedang habis
+        self.limit = max(1, self.leased)
+        self.peak = max(self.peak, self.limit)
+
+    def _decrease(self, reason):
+        previous = self.limit
+        self.ssthresh = max(self.floor, self.limit // 2)
+        self._resize(self.ssthresh)
+        if self.limit < previous:
+            self.decreases[reason] = self.decreases.get(reason, 0) + 1
+        self.backed_off = True
+        self._reset_window()
+
+    def _end_window(self):
+        events = self.window_events
+        if self.window_timeouts > events * TIMEOUT_BACKOFF_RATIO:
+            self._decrease("timeouts")
+            return
+
+        if self.window_responses:
+            refused_ratio = self.window_refused / self.window_responses
+            storm = (self.refused_ewma is not None
+                     and refused_ratio - self.refused_ewma > REFUSED_STORM_JUMP)
+            if self.refused_ewma is None:
+                self.refused_ewma = refused_ratio
+            else:
+                self.refused_ewma += REFUSED_EWMA_WEIGHT * (refused_ratio - self.refused_ewma)
+            if storm:
+                self._decrease("refused-storm")
+                return
+
+        if self.window_fast >= self.window_responses * FAST_RESPONSE_RATIO and self.limit < self.ceiling:
+            previous = self.limit
+            if self.limit < self.ssthresh:
+                self._resize(self.limit * 2)
+            else:
+                self._resize(self.limit + ADDITIVE_STEP)
+            if self.limit > previous:
+                self.increases += 1
+        self._reset_window()
+
+    def _event(self):
+        self.backed_off = False
+        self.window_events += 1
+        # Satu keputusan per jendela, seperti TCP satu kali per RTT
+        if self.window_events >= self.limit:
+            self._end_window()
+
+    def on_response(self, fast, refused=False):
+        """A connect was answered (SYN-ACK or RST); fast compares it to the target's min RTT"""
+        with self.lock:
+            self.window_responses += 1
+            if fast:
+                self.window_fast += 1
+            if refused:
+                self.window_refused += 1
+            self._event()
+
+    def on_timeout(self):
+        with self.lock:
+            self.window_timeouts += 1
+            self._event()
+
+    def on_resource_error(self):
+        """EMFILE/ENOBUFS and friends: halve now and cap growth below the failing window"""
+        with self.lock:
+            if self.backed_off:
+                return
+            self.ceiling = max(self.floor, self.limit - 1)
+            self._decrease("resource-error")
+
+    def shard_spec(self, count):
+        """Constructor kwargs for count shard processes, each with its own FD budget"""
+        with self.lock:
+            return {
+                "initial": max(1, self.limit // count),
+                "ceiling": max(1, self.ceiling // count),
+                "floor": max(1, self.floor // count)
+            }
+
+    def merge_shard(self, stats):
+        with self.lock:
+            self.increases += stats["increases"]
+            for reason, count in stats["decreases"].items():
+                self.decreases[reason] = self.decreases.get(reason, 0) + count
+            self.peak = max(self.peak, stats["peak"])
+
+    def close(self):
+        """Return the leased descriptors to the budget once the scan is over"""
+        with self.lock:
+            self.budget.release(self.leased)
+            self.leased = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "initial": self.initial,
+                "final": self.limit,
+                "peak": self.peak,
+                "floor": self.floor,
+                "ceiling": self.ceiling,
+                "increases": self.increases,
+                "decreases": dict(self.decreases)
+            }
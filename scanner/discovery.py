@@ -0,0 +1,132 @@
+import asyncio
+import errno
+import os
+import select
+import socket
+import struct
+import time
+
+from .services import PORT_GROUPS
+from .syn_scanner import _checksum
+
+# Beberapa port critical yang paling sering terbuka atau setidaknya dijawab RST
+DISCOVERY_PORTS = [p for p in (80, 443, 22, 3389, 21, 25) if p in PORT_GROUPS['critical']]
+DISCOVERY_TIMEOUT = 1.0
+DISCOVERY_CONCURRENCY = 256
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+async def _tcp_alive(ip, port, timeout):
+    """True when ip answers on port at all: SYN-ACK (open) or RST (closed) both prove it is up"""
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), timeout)
+        return True
+    except ConnectionRefusedError:
+        return True
+    except (asyncio.TimeoutError, OSError):
+        return False
+    finally:
+        sock.close()
+
+
+async def _probe_host(ip, ports, timeout, semaphore):
+    async with semaphore:
+        tasks = [asyncio.ensure_future(_tcp_alive(ip, port, timeout)) for port in ports]
+        try:
+            # Satu jawaban cukup, sisa probe host itu dibatalkan
+            for next_done in asyncio.as_completed(tasks):
+                if await next_done:
+                    return ip, True
+            return ip, False
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def _tcp_discovery(ips, ports, timeout):
+    semaphore = asyncio.Semaphore(max(1, DISCOVERY_CONCURRENCY // max(1, len(ports))))
+    results = await asyncio.gather(*(_probe_host(ip, ports, timeout, semaphore) for ip in ips))
+    return {ip for ip, alive in results if alive}
+
+
+def _open_icmp_socket():
+    """Raw ICMP socket (root), else the unprivileged ping socket, else None"""
+    for kind in (socket.SOCK_RAW, socket.SOCK_DGRAM):
+        try:
+            return socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP), kind
+        except OSError:
+            continue
+    return None, None
+
+
+def icmp_discovery(ips, timeout=DISCOVERY_TIMEOUT):
+    """Hosts answering an ICMP echo request; empty when ICMP sockets are not permitted"""
+    sock, kind = _open_icmp_socket()
+    if sock is None:
+        return set()
+
+    identifier = os.getpid() & 0xffff
+    alive = set()
+    targets = set(ips)
+    try:
+        sock.setblocking(False)
+        for sequence, ip in enumerate(ips):
+            header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, identifier, sequence & 0xffff)
+            payload = b'sena-discovery'
+            checksum = _checksum(header + payload)
+            packet = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, identifier,
+                                 sequence & 0xffff) + payload
+            try:
+                sock.sendto(packet, (ip, 0))
+            except OSError:
+                continue
+
+        deadline = time.monotonic() + timeout
+        while alive != targets:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([sock], [], [], remaining)
+            if not readable:
+                break
+            try:
+                packet, address = sock.recvfrom(1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    continue
+                break
+            # Raw socket menyertakan header IP, ping socket tidak
+            offset = (packet[0] & 0x0f) * 4 if kind == socket.SOCK_RAW else 0
+            if len(packet) < offset + 8 or packet[offset] != ICMP_ECHO_REPLY:
+                continue
+            # Ping socket mengganti identifier dengan port lokal, jadi hanya dicek untuk raw
+            if kind == socket.SOCK_RAW and struct.unpack('!H', packet[offset + 4:offset + 6])[0] != identifier:
+                continue
+            if address[0] in targets:
+                alive.add(address[0])
+    finally:
+        sock.close()
+    return alive
+
+
+def discover_hosts(ips, ports=None, timeout=DISCOVERY_TIMEOUT, icmp=False):
+    """Split ips into (alive, {ip: reason}) before spending a full port sweep on them"""
+    ips = list(ips)
+    alive = set()
+    reasons = {}
+    if icmp:
+        for ip in icmp_discovery(ips, timeout):
+            alive.add(ip)
+            reasons[ip] = "icmp-echo"
+
+    pending = [ip for ip in ips if ip not in alive]
+    if pending:
+        for ip in asyncio.run(_tcp_discovery(pending, ports or DISCOVERY_PORTS, timeout)):
+            alive.add(ip)
+            reasons[ip] = "tcp"
+    return [ip for ip in ips if ip in alive], reasons
@@ -0,0 +1,196 @@
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .progress import ScanProgress
+from utils.metrics import REGISTRY
+
+# Jumlah scan yang berjalan bersamaan dan yang boleh mengantre
+SCAN_JOB_WORKERS = 4
+SCAN_JOB_QUEUE_LIMIT = 32
+
+# Job yang sudah selesai disimpan sebentar agar hasilnya bisa diambil
+FINISHED_JOBS_KEPT = 200
+
+_executor = ThreadPoolExecutor(max_workers=SCAN_JOB_WORKERS, thread_name_prefix="scan-job")
+_lock = threading.Lock()
+scan_jobs = OrderedDict()
+
+
+def _jobs_in_state(status):
+    # Job yang menumpang scan lain tidak memakai worker, tidak dihitung
+    with _lock:
+        return sum(1 for job in scan_jobs.values() if job.status == status and job.leader is None)
+
+
+def _running_probe_rate():
+    """Probes per second summed over the scans running right now"""
+    with _lock:
+        running = [job for job in scan_jobs.values() if job.status == "running" and job.leader is None]
+    now = datetime.now()
+    rate = 0.0
+    for job in running:
+        elapsed = (now - job.started_at).total_seconds()
+        if elapsed > 0:
+            rate += job.progress.snapshot()["ports_done"] / elapsed
+    return round(rate, 1)
+
+
+SCANS_IN_FLIGHT = REGISTRY.gauge("sena_scans_in_flight", "Scan jobs currently running",
+                                 lambda: _jobs_in_state("running"))
+SCANS_QUEUED = REGISTRY.gauge("sena_scans_queued", "Scan jobs waiting for a worker",
+                              lambda: _jobs_in_state("queued"))
+PROBE_RATE = REGISTRY.gauge("sena_probes_per_second", "Probe rate of the scans currently running",
+                            _running_probe_rate)
+SCANS_TOTAL = REGISTRY.counter("sena_scans_total", "Finished scan jobs by outcome")
+SCANS_COALESCED = REGISTRY.counter("sena_scans_coalesced_total",
+                                   "Scan requests served by attaching to an identical running scan")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobAlreadyRunning(Exception):
+    pass
+
+
+class ScanJob:
+    def __init__(self, scan_id, ports_total, coalesce_key=None, leader=None, share=None):
+        self.scan_id = scan_id
+        self.status = "queued"
+        self.progress = ScanProgress(ports_total)
+        self.result = None
+        # Request identik yang datang selama job ini belum selesai menumpang hasilnya
+        self.coalesce_key = coalesce_key
+        self.followers = []
+        # Job yang benar-benar menjalankan scan, None kalau job ini sendiri yang menjalankannya;
+        # share(result) membuat hasil milik follower dari hasil leader
+        self.leader = leader
+        self.share = share
+        if leader is not None:
+            self.progress = leader.progress
+            self.status = leader.status
+            self.started_at = leader.started_at
+        self.error = None
+        self.submitted_at = datetime.now()
+        if leader is None:
+            self.started_at = None
+        self.finished_at = None
+        # Antrean event untuk endpoint streaming, None kalau tidak ada yang mendengarkan
+        self.events = None
+
+    def stream_events(self):
+        """Start queueing ("port", ip, port_info) events; None marks the end of the job"""
+        self.events = queue.Queue()
+        self.progress.add_listener(lambda ip, port_info: self.events.put(("port", ip, port_info)))
+        return self.events
+
+    @property
+    def finished(self):
+        return self.status in ("completed", "failed")
+
+    def to_dict(self):
+        return {
+            "scan_id": self.scan_id,
+            "status": self.status,
+            "coalesced_with": self.leader.scan_id if self.leader else None,
+            "progress": self.progress.snapshot(),
+            "error": self.error,
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def run(self, scan_callable):
+        self.started_at = datetime.now()
+        with _lock:
+            self.status = "running"
+            for follower in self.followers:
+                follower.status = "running"
+                follower.started_at = self.started_at
+        status = "failed"
+        try:
+            self.result = scan_callable(self.progress)
+            status = "completed"
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            # Setelah ini tidak ada follower baru, request berikutnya memulai scan sendiri
+            with _lock:
+                self.status = status
+                followers = list(self.followers)
+            for follower in followers:
+                follower.adopt(self)
+            self._finish()
+
+    def adopt(self, leader):
+        """Finish this follower with the outcome of the scan it attached to"""
+        if leader.status == "completed":
+            try:
+                self.result = self.share(leader.result)
+                self.status = "completed"
+            except Exception as e:
+                self.error = str(e)
+                self.status = "failed"
+        else:
+            self.error = leader.error
+            self.status = "failed"
+        self._finish()
+
+    def _finish(self):
+        SCANS_TOTAL.inc(status=self.status)
+        self.finished_at = datetime.now()
+        if self.events is not None:
+            self.events.put(None)
+
+
+def _prune_finished():
+    finished = [scan_id for scan_id, job in scan_jobs.items() if job.finished]
+    for scan_id in finished[:max(0, len(finished) - FINISHED_JOBS_KEPT)]:
+        del scan_jobs[scan_id]
+
+
+def _running_leader(coalesce_key):
+    for job in scan_jobs.values():
+        if job.coalesce_key == coalesce_key and job.leader is None and not job.finished:
+            return job
+    return None
+
+
+def submit_scan_job(scan_id, scan_callable, ports_total, stream=False, coalesce_key=None, share=None):
+    """Queue scan_callable(progress) on the bounded scan worker pool
+
+    With a coalesce_key, a request identical to a scan that is still queued or running
+    attaches to it instead of sweeping again: it gets its own job under scan_id, shares
+    the leader's progress, and share(leader_result) turns the leader's result into its own.
+    A stream attached mid-scan only sees the ports found from then on, the summary has all.
+    """
+    with _lock:
+        existing = scan_jobs.get(scan_id)
+        if existing and not existing.finished:
+            raise JobAlreadyRunning("Scan is still running")
+        leader = _running_leader(coalesce_key) if coalesce_key is not None else None
+        if leader is None:
+            waiting = sum(1 for job in scan_jobs.values() if not job.finished and job.leader is None)
+            if waiting >= SCAN_JOB_WORKERS + SCAN_JOB_QUEUE_LIMIT:
+                raise JobQueueFull("Too many scans in progress, please try again later")
+        _prune_finished()
+        job = ScanJob(scan_id, ports_total, coalesce_key, leader, share)
+        if stream:
+            job.stream_events()
+        scan_jobs[scan_id] = job
+        if leader is not None:
+            leader.followers.append(job)
+            SCANS_COALESCED.inc()
+            return job
+
+    _executor.submit(job.run, scan_callable)
+    return job
+
+
+def get_scan_job(scan_id):
+    with _lock:
+        return scan_jobs.get(scan_id)
@@ -0,0 +1,65 @@
+import re
+
+
+class FingerprintMatcher:
+    """All banner signatures compiled into one trie-shaped regex, matched in a single pass"""
+
+    def __init__(self, fingerprints):
+        # pattern (lowercase) -> [(index, service, ports)]
+        self.entries = {}
+        for index, (pattern, service, ports) in enumerate(fingerprints):
+            key = pattern.lower()
+            self.entries.setdefault(key, []).append(
+                (index, service, frozenset(ports) if ports else None))
+
+        self.trie = {}
+        for key in self.entries:
+            node = self.trie
+            for byte in key:
+                node = node.setdefault(byte, {})
+            node[None] = key
+
+        # Lookahead supaya pola yang tumpang tindih di posisi berbeda tetap terbaca
+        self.regex = re.compile(b'(?=(' + self._trie_regex(self.trie) + b'))', re.DOTALL)
+
+    def _trie_regex(self, node):
+        branches = [re.escape(bytes([byte])) + self._trie_regex(child)
+                    for byte, child in sorted((k, v) for k, v in node.items() if k is not None)]
+        if not branches:
+            return b''
+        body = branches[0] if len(branches) == 1 else b'(?:' + b'|'.join(branches) + b')'
+        # Node terminal: sisa pola opsional, greedy supaya yang terpanjang menang
+        if None in node:
+            return b'(?:' + body + b')?'
+        return body
+
+    def _prefix_patterns(self, text):
+        """Every signature that is a prefix of text (text is the longest match at a position)"""
+        node = self.trie
+        for byte in text:
+            node = node.get(byte)
+            if node is None:
+                return
+            if None in node:
+                yield node[None]
+
+    def matches(self, banner):
+        """Set of lowercase signatures found anywhere in banner"""
+        found = set()
+        # Banner di-lowercase sekali, regex-nya sendiri case-sensitive (lebih cepat)
+        for text in self.regex.findall(banner.lower()):
+            found.update(self._prefix_patterns(text))
+        return found
+
+    def match(self, banner, port):
+        """Best service for banner on port, or None when no signature matches"""
+        best = None
+        for key in self.matches(banner):
+            for index, service, ports in self.entries[key]:
+                if ports is not None and port not in ports:
+                    continue
+                # Pola lebih panjang (produk spesifik) > port cocok > urutan di database
+                rank = (-len(key), ports is None, index)
+                if best is None or rank < best[0]:
+                    best = (rank, service)
+        return best[1] if best else None
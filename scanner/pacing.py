@@ -0,0 +1,198 @@
+import threading
+import time
+
+# Anggaran probe per detik untuk seluruh proses, berlaku untuk semua scan yang berjalan
+GLOBAL_PROBE_RATE = 20000
+# Satu target tidak boleh dibanjiri lebih dari ini, berapa pun jumlah scan ke target itu
+PER_TARGET_RATE = 5000
+# Probe yang boleh dikirim beruntun sebelum pacing mulai menahan
+PACING_BURST = 50
+# Scan sharded tanpa rate sendiri menyewa paling banyak porsi ini dari sisa anggaran
+SHARD_LEASE_SHARE = 0.5
+
+# Bucket per target yang sudah lama diam dibuang
+IDLE_BUCKET_SECONDS = 60
+MAX_IDLE_BUCKETS = 4096
+
+
+class _Bucket:
+    """GCRA token bucket: tat is the theoretical arrival time of the next probe"""
+
+    def __init__(self, rate, burst=PACING_BURST):
+        self.burst = burst
+        self.tat = 0.0
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        self.interval = 1.0 / rate
+        self.tolerance = self.interval * self.burst
+
+    def earliest(self, now):
+        return max(now, self.tat - self.tolerance)
+
+    def take(self, at):
+        self.tat = max(self.tat, at) + self.interval
+
+
+class Pacer:
+    """Process-wide probe budget: one global bucket plus one bucket per target
+
+    Shard processes cannot reach this object, so a sharded scan leases part of the
+    budget for its processes and the buckets here shrink by that much until release().
+    """
+
+    def __init__(self, global_rate=GLOBAL_PROBE_RATE, per_target_rate=PER_TARGET_RATE, target_rates=None):
+        self.global_rate = global_rate
+        self.per_target_rate = per_target_rate
+        # Laju per target yang berbeda dari per_target_rate (porsi shard), ip -> rate
+        self.target_rates = target_rates or {}
+        self.global_bucket = _Bucket(global_rate)
+        self.targets = {}
+        # Laju yang sedang disewa shard di proses lain, global dan per target
+        self.leased = 0
+        self.target_leases = {}
+        self.lock = threading.Lock()
+
+    def _target_rate(self, ip):
+        rate = self.target_rates.get(ip, self.per_target_rate)
+        return max(1, rate - self.target_leases.get(ip, 0))
+
+    def _target_bucket(self, ip, now):
+        bucket = self.targets.get(ip)
+        if bucket is None:
+            if len(self.targets) >= MAX_IDLE_BUCKETS:
+                self._prune(now)
+            bucket = self.targets[ip] = _Bucket(self._target_rate(ip))
+        return bucket
+
+    def lease(self, rate, ips):
+        """Reserve rate probes/s (None = a share of what is left) for other processes, globally
+        and for each target in ips; returns the lease to hand back to release()"""
+        with self.lock:
+            available = self.global_rate - self.leased
+            granted = max(1, min(rate, available) if rate else int(available * SHARD_LEASE_SHARE))
+            self.leased += granted
+            self.global_bucket.set_rate(max(1, self.global_rate - self.leased))
+            targets = {}
+            for ip in ips:
+                available = self.per_target_rate - self.target_leases.get(ip, 0)
+                targets[ip] = max(1, min(granted, available if rate else int(available * SHARD_LEASE_SHARE)))
+                self.target_leases[ip] = self.target_leases.get(ip, 0) + targets[ip]
+                if ip in self.targets:
+                    self.targets[ip].set_rate(self._target_rate(ip))
+            return {"global_rate": granted, "target_rates": targets}
+
+    def release(self, lease):
+        with self.lock:
+            self.leased = max(0, self.leased - lease["global_rate"])
+            self.global_bucket.set_rate(max(1, self.global_rate - self.leased))
+            for ip, rate in lease["target_rates"].items():
+                remaining = self.target_leases.get(ip, 0) - rate
+                if remaining > 0:
+                    self.target_leases[ip] = remaining
+                else:
+                    self.target_leases.pop(ip, None)
+                if ip in self.targets:
+                    self.targets[ip].set_rate(self._target_rate(ip))
+
+    def _prune(self, now):
+        for ip in [ip for ip, bucket in self.targets.items()
+                   if bucket.tat < now - IDLE_BUCKET_SECONDS]:
+            del self.targets[ip]
+
+    def reserve(self, ip, scan_bucket=None):
+        """Book the next probe slot to ip, returns how long the caller must wait first"""
+        with self.lock:
+            now = time.monotonic()
+            buckets = [self.global_bucket, self._target_bucket(ip, now)]
+            if scan_bucket is not None:
+                buckets.append(scan_bucket)
+            # Slot diambil bersamaan dari semua bucket, yang paling ketat menentukan
+            at = max(bucket.earliest(now) for bucket in buckets)
+            for bucket in buckets:
+                bucket.take(at)
+            return at - now
+
+
+PACER = Pacer()
+
+
+class ScanPacing:
+    """One scan's view of the shared pacer, with an optional per-scan rate and stats"""
+
+    def __init__(self, pacer=PACER, rate=None):
+        self.pacer = pacer
+        self.rate = rate
+        self.scan_bucket = _Bucket(rate) if rate else None
+        self.probes = 0
+        # Probe yang harus menunggu slot (bukan total detik, probe menunggu bersamaan)
+        self.throttled = 0
+        self.started = time.monotonic()
+        # Sewaan dari pacer selama shard berjalan, None kalau tidak ada
+        self.lease = None
+        self.lock = threading.Lock()
+
+    def delay(self, ip):
+        """Reserve a probe to ip and return the wait before sending it"""
+        delay = self.pacer.reserve(ip, self.scan_bucket)
+        with self.lock:
+            self.probes += 1
+            if delay > 0:
+                self.throttled += 1
+        return delay
+
+    def wait(self, ip):
+        """Blocking variant of delay() for sender loops"""
+        delay = self.delay(ip)
+        if delay > 0:
+            time.sleep(delay)
+
+    def set_rate(self, rate):
+        """Change the per-scan rate mid-scan, None removes the per-scan limit"""
+        with self.pacer.lock:
+            self.rate = rate
+            self.scan_bucket = _Bucket(rate) if rate else None
+
+    def scale_rate(self, factor):
+        """Slow this scan down (e.g. UDP retries), never below one probe per second"""
+        if self.rate:
+            self.set_rate(max(1, int(self.rate * factor)))
+
+    def lease_shards(self, count, ips):
+        """Lease this scan's share of the shared pacer and split it into rates for count shard
+        workers, which cannot reach the pacer; release_shards() gives it back"""
+        self.lease = self.pacer.lease(self.rate, ips)
+        return {
+            "global_rate": max(1, self.lease["global_rate"] // count),
+            "target_rates": {ip: max(1, rate // count) for ip, rate in self.lease["target_rates"].items()},
+            "rate": max(1, self.rate // count) if self.rate else None
+        }
+
+    def release_shards(self):
+        if self.lease is not None:
+            self.pacer.release(self.lease)
+            self.lease = None
+
+    @classmethod
+    def for_shard(cls, rates):
+        pacer = Pacer(rates["global_rate"], min(rates["target_rates"].values(), default=rates["global_rate"]),
+                      rates["target_rates"])
+        return cls(pacer, rates["rate"])
+
+    def merge_shard(self, probes, throttled):
+        with self.lock:
+            self.probes += probes
+            self.throttled += throttled
+
+    def snapshot(self):
+        """Rates applied to the scan and the rate it actually achieved"""
+        elapsed = time.monotonic() - self.started
+        with self.lock:
+            return {
+                "global_rate": self.pacer.global_rate,
+                "per_target_rate": self.pacer.per_target_rate,
+                "scan_rate": self.rate,
+                "probes_sent": self.probes,
+                "effective_rate": round(self.probes / elapsed, 1) if elapsed > 0 else None,
+                "throttled_probes": self.throttled
+            }
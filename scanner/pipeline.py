@@ -0,0 +1,87 @@
+from .concurrency import FD_BUDGET
+
+# Pool banner-grab terpisah dari pool connect mode threaded; worker banner kebanyakan
+# hanya menunggu, jadi ukurannya mengikuti pool connect, bukan jumlah CPU
+FINGERPRINT_WORKERS = 256
+# Socket terbuka yang boleh menunggu fingerprint sebelum sapuan connect ditahan
+FINGERPRINT_QUEUE_LIMIT = 512
+# Batas yang sama untuk event loop (async dan sharded)
+ASYNC_FINGERPRINT_CONCURRENCY = 1024
+ASYNC_FINGERPRINT_QUEUE_LIMIT = 2048
+# Antrean mendapat paling banyak 1/4 anggaran FD proses
+QUEUE_BUDGET_SHARE = 4
+
+
+class FingerprintPipeline:
+    """Bounded hand-off of open sockets from the connect sweep to the fingerprint stage
+
+    Discovery frees its in-flight slot as soon as a port answers, the connected socket
+    waits here for a banner worker. Only the engine's own thread or event loop touches
+    the counters, so there is no lock.
+    """
+
+    def __init__(self, workers, queue_limit, budget=FD_BUDGET):
+        self.budget = budget
+        # Socket yang menunggu tetap memakai FD, dipinjam dari anggaran yang sama dengan jendela connect;
+        # paling banyak seperempatnya supaya jendela connect masih bisa tumbuh
+        self.leased = budget.lease(min(int(queue_limit), max(1, budget.total // QUEUE_BUDGET_SHARE)))
+        self.queue_limit = max(1, self.leased)
+        self.workers = max(1, min(int(workers), self.queue_limit))
+        self.pending = 0
+        self.handed_off = 0
+        self.queue_peak = 0
+        # Berapa kali sapuan connect menunggu karena antrean fingerprint penuh
+        self.stalls = 0
+
+    @classmethod
+    def threaded(cls):
+        return cls(FINGERPRINT_WORKERS, FINGERPRINT_QUEUE_LIMIT)
+
+    @classmethod
+    def event_loop(cls):
+        return cls(ASYNC_FINGERPRINT_CONCURRENCY, ASYNC_FINGERPRINT_QUEUE_LIMIT)
+
+    def admits(self, connecting, window):
+        """Whether one more connect fits: sockets in flight plus sockets waiting for a banner
+        stay within what the connect window and this queue leased"""
+        return connecting + self.pending < window + self.queue_limit
+
+    def hand_off(self):
+        self.pending += 1
+        self.handed_off += 1
+        self.queue_peak = max(self.queue_peak, self.pending)
+
+    def complete(self):
+        self.pending -= 1
+
+    def stall(self):
+        self.stalls += 1
+
+    def shard_spec(self, count):
+        """Constructor kwargs for count shard processes, each leasing from its own budget"""
+        return {
+            "workers": max(1, self.workers // count),
+            "queue_limit": max(1, self.queue_limit // count)
+        }
+
+    def state(self):
+        return {"handed_off": self.handed_off, "queue_peak": self.queue_peak, "stalls": self.stalls}
+
+    def merge_shard(self, state):
+        self.handed_off += state["handed_off"]
+        self.queue_peak = max(self.queue_peak, state["queue_peak"])
+        self.stalls += state["stalls"]
+
+    def close(self):
+        """Return the queue's descriptors to the budget once the scan is over"""
+        self.budget.release(self.leased)
+        self.leased = 0
+
+    def snapshot(self):
+        return {
+            "fingerprint_workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "handed_off": self.handed_off,
+            "queue_peak": self.queue_peak,
+            "discovery_stalls": self.stalls
+        }
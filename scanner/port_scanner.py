@@ -1,19 +1,49 @@
-from flask import Blueprint, render_template, request, jsonify
-from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import socket
+import errno
 import random
+import math
 import uuid
 from datetime import datetime
 from .pdf_reports import generate_pdf
+from .services import (
+    COMMON_SERVICES, PORT_GROUPS, open_port_info, describe_banner
+)
+from .probes import PROBE_DB, probe_payload
+from .async_engine import run_async_scan, clamp_concurrency, ASYNC_MAX_CONCURRENCY
+from .sharding import run_sharded_scan, SHARD_DEFAULT_PROCESSES, SHARD_MAX_PROCESSES
+from .syn_scanner import run_syn_scan, has_raw_socket_capability
+from .udp_scanner import run_udp_scan, UDP_DEFAULT_RATE, UDP_MAX_RATE
+from .pacing import ScanPacing, PACER
+from .targets import parse_targets, TargetScheduler, TargetError
+from .jobs import submit_scan_job, get_scan_job, JobQueueFull, JobAlreadyRunning
+from .checkpoint import ScanCheckpoint, checkpoint_exists, prune_checkpoints
+from .cache import RESULT_CACHE
+from .discovery import discover_hosts
+from .concurrency import (
+    ConcurrencyController, RESOURCE_ERRNOS, THREADED_INITIAL_CONCURRENCY, THREADED_MAX_CONCURRENCY,
+    ASYNC_INITIAL_CONCURRENCY
+)
+from .pipeline import FingerprintPipeline
+from .timing import RttEstimator, CONNECT_TIMEOUT, BANNER_TIMEOUT, DEFAULT_RETRIES
 from collections import deque
 import threading
 import time
+import json
+import queue
 
 # Import blueprint dari __init__.py
 from . import scanner_bp
+from extension import limiter
+from utils.resolver import RESOLVER
+from utils.metrics import (
+    REGISTRY, PhaseTimer, HistogramData, LATENCY_BUCKETS, BANNER_BUCKETS, DURATION_BUCKETS
+)
 
 # In-memory storage untuk scan histories dengan struktur yang lebih lengkap
 scan_histories = {}
+history_lock = threading.Lock()
 scan_stats = {
     "total_scans": 0,
     "total_threats": 0,
@@ -21,218 +51,109 @@ scan_stats = {
     "last_scan": None
 }
 
-# Service fingerprinting database
-SERVICE_FINGERPRINTS = {
-    # HTTP services
-    b'HTTP/1.': 'HTTP',
-    b'Server: Apache': 'Apache HTTP Server',
-    b'Server: nginx': 'Nginx HTTP Server',
-    b'Server: Microsoft-IIS': 'Microsoft IIS',
-    b'Server: lighttpd': 'Lighttpd HTTP Server',
-    
-    # SSH
-    b'SSH-2.0': 'SSH-2.0',
-    b'SSH-1.99': 'SSH-1.99',
-    
-    # FTP
-    b'220 ': 'FTP',
-    b'220-FileZilla': 'FileZilla FTP Server',
-    b'220 Microsoft FTP': 'Microsoft FTP Server',
-    b'220-ProFTPD': 'ProFTPD Server',
-    
-    # SMTP
-    b'220 ': 'SMTP (if port 25/587/465)',
-    b'220-Welcome': 'SMTP Server',
-    
-    # POP3
-    b'+OK': 'POP3 (if port 110/995)',
-    
-    # IMAP
-    b'* OK': 'IMAP (if port 143/993)',
-    
-    # Telnet
-    b'Telnet': 'Telnet',
-    
-    # DNS
-    b'DNS': 'DNS Server',
-    
-    # MySQL
-    b'mysql_native_password': 'MySQL Server',
-    
-    # PostgreSQL
-    b'FATAL': 'PostgreSQL (if port 5432)',
-    
-    # Redis
-    b'-ERR': 'Redis (if port 6379)',
-    
-    # MongoDB
-    b'MongoDB': 'MongoDB Server',
-    
-    # RDP
-    b'RDP': 'Remote Desktop Protocol',
-    
-    # SNMP
-    b'SNMP': 'SNMP',
-    
-    # LDAP
-    b'LDAP': 'LDAP Server',
-}
-
-# Common service ports
-COMMON_SERVICES = {
-    21: 'FTP',
-    22: 'SSH',
-    23: 'Telnet',
-    25: 'SMTP',
-    53: 'DNS',
-    80: 'HTTP',
-    110: 'POP3',
-    143: 'IMAP',
-    443: 'HTTPS',
-    993: 'IMAPS',
-    995: 'POP3S',
-    3389: 'RDP',
-    5432: 'PostgreSQL',
-    3306: 'MySQL',
-    6379: 'Redis',
-    27017: 'MongoDB',
-    161: 'SNMP',
-    389: 'LDAP',
-    636: 'LDAPS',
-    1433: 'MSSQL',
-    5984: 'CouchDB',
-    8080: 'HTTP-Alt',
-    8443: 'HTTPS-Alt',
-    9200: 'Elasticsearch',
-    5601: 'Kibana',
-    6666: 'IRC',
-    6667: 'IRC',
-    119: 'NNTP',
-    2049: 'NFS',
-    111: 'RPC',
-    135: 'RPC',
-    139: 'NetBIOS',
-    445: 'SMB',
-    1521: 'Oracle',
-    1526: 'Oracle',
-    2181: 'ZooKeeper',
-    9092: 'Kafka',
-    11211: 'Memcached',
-    2375: 'Docker',
-    2376: 'Docker TLS',
-    4369: 'Erlang',
-    5672: 'RabbitMQ',
-    15672: 'RabbitMQ Management',
-    9090: 'Prometheus',
-    3000: 'Grafana',
-    8086: 'InfluxDB',
-    9000: 'SonarQube',
-    8081: 'Nexus',
-    50070: 'Hadoop NameNode',
-    9999: 'Hadoop Secondary NameNode',
-    8088: 'Hadoop Resource Manager',
-    19888: 'Hadoop History Server',
-    2888: 'Zookeeper',
-    3888: 'Zookeeper',
-    7077: 'Spark Master',
-    4040: 'Spark UI',
-    18080: 'Spark History',
-    8020: 'Hadoop HDFS',
-    9083: 'Hive Metastore',
-    10000: 'Hive Server2',
-    10002: 'Hive WebHCat',
-    50075: 'Hadoop DataNode',
-    8042: 'Hadoop NodeManager',
-    8188: 'Hadoop Timeline Service',
-    19890: 'Hadoop MapReduce History',
-    8032: 'Hadoop ResourceManager',
-    8030: 'Hadoop ResourceManager Scheduler',
-    8031: 'Hadoop ResourceManager Tracker',
-    8033: 'Hadoop ResourceManager Admin',
-    10020: 'Hadoop MapReduce Job History',
-    13562: 'Hadoop Shuffle'
-}
+# Metrik proses untuk /metrics, per-scan breakdown ada di scan_result
+SCAN_DURATION = REGISTRY.histogram("sena_scan_duration_seconds", "Wall-clock duration of finished scans",
+                                   DURATION_BUCKETS)
+SCAN_PHASE_SECONDS = REGISTRY.counter("sena_scan_phase_seconds_total", "Seconds spent per scan phase")
+PROBES_TOTAL = REGISTRY.counter("sena_probes_total", "Probes sent by finished scans")
+PROBE_LATENCY = REGISTRY.histogram("sena_probe_latency_seconds", "Connect round-trip of answered probes",
+                                   LATENCY_BUCKETS)
+BANNER_READ = REGISTRY.histogram("sena_banner_read_seconds", "Time spent reading one service banner",
+                                 BANNER_BUCKETS)
+PDF_RENDER = REGISTRY.histogram("sena_pdf_render_seconds", "PDF report render time", DURATION_BUCKETS)
 
-# HTTP probes for better detection
-HTTP_PROBES = [
-    b'GET / HTTP/1.1\r\nHost: {host}\r\n\r\n',
-    b'HEAD / HTTP/1.1\r\nHost: {host}\r\n\r\n',
-    b'OPTIONS / HTTP/1.1\r\nHost: {host}\r\n\r\n'
+# Skor prioritas per grup, dari yang paling penting
+PRIORITY_GROUPS = [
+    (10, 'critical'),
+    (9, 'database'),
+    (8, 'web'),
+    (7, 'admin'),
+    (6, 'messaging'),
+    (5, 'monitoring'),
+    (4, 'development')
 ]
+COMMON_SERVICE_PRIORITY = 3
+DEFAULT_PRIORITY = 1
+# Range port yang sah untuk /scan, traversal dan tabel prioritas tidak pernah melihat port di luar ini
+MIN_PORT = 1
+MAX_PORT = 65535
+
+def _build_port_priority():
+    """Priority score of every port 0-65535, computed once at import"""
+    priority = bytearray([DEFAULT_PRIORITY]) * (MAX_PORT + 1)
+    for port in COMMON_SERVICES:
+        priority[port] = COMMON_SERVICE_PRIORITY
+    # Grup dengan skor tertinggi ditulis terakhir supaya menang
+    for score, group in reversed(PRIORITY_GROUPS):
+        for port in PORT_GROUPS[group]:
+            priority[port] = score
+    return priority
+
+PORT_PRIORITY = _build_port_priority()
 
-# Port range groups for intelligent traversal
-PORT_GROUPS = {
-    'critical': [21, 22, 23, 25, 53, 80, 110, 143, 443, 993, 995, 3389],
-    'database': [3306, 5432, 1433, 1521, 6379, 27017, 5984, 9200],
-    'web': [80, 443, 8080, 8443, 8000, 3000, 9000, 8081],
-    'messaging': [25, 587, 465, 110, 143, 993, 995, 5672, 15672],
-    'admin': [22, 23, 3389, 5985, 5986, 135, 139, 445],
-    'monitoring': [161, 9090, 3000, 5601, 8086, 9000],
-    'development': [8080, 8443, 3000, 4000, 5000, 8000, 9000, 8081]
+# Port untuk setiap skor di atas default (hanya beberapa puluh port)
+PRIORITY_PORTS = {}
+for _port, _score in enumerate(PORT_PRIORITY):
+    if _score != DEFAULT_PRIORITY:
+        PRIORITY_PORTS.setdefault(_score, []).append(_port)
+
+def _permuted_range(start, end, rng=random):
+    """Every port in start..end exactly once, in shuffled order, without a list"""
+    size = end - start + 1
+    if size <= 0:
+        return
+    # Permutasi affine i -> (a*i + b) mod size, a koprima dengan size
+    step = rng.randrange(1, size) if size > 1 else 1
+    while math.gcd(step, size) != 1:
+        step = rng.randrange(1, size)
+    offset = rng.randrange(size)
+    for i in range(size):
+        yield start + (step * i + offset) % size
+
+# Port yang biasanya ikut terbuka bersama port kunci
+RELATED_PORTS = {
+    80: [8080, 8443, 8000, 3000],
+    443: [8443, 8080],
+    3306: [3307, 33060],
+    22: [2222, 22222]
 }
 
+PROMOTABLE_PORTS = frozenset(
+    [port for group_ports in PORT_GROUPS.values() for port in group_ports] +
+    [port for related in RELATED_PORTS.values() for port in related])
+
 class PortTraversal:
     def __init__(self, start_port=1, end_port=1024):
         self.start_port = start_port
         self.end_port = end_port
         self.visited = set()
         self.discovered_services = {}
+        # Port yang dinaikkan antreannya oleh mark_open
+        self.promoted = deque()
+        self.promoted_count = 0
         
     def get_priority_score(self, port):
         """Calculate priority score for a port based on service importance"""
-        if port in PORT_GROUPS['critical']:
-            return 10
-        elif port in PORT_GROUPS['database']:
-            return 9
-        elif port in PORT_GROUPS['web']:
-            return 8
-        elif port in PORT_GROUPS['admin']:
-            return 7
-        elif port in PORT_GROUPS['messaging']:
-            return 6
-        elif port in PORT_GROUPS['monitoring']:
-            return 5
-        elif port in PORT_GROUPS['development']:
-            return 4
-        elif port in COMMON_SERVICES:
-            return 3
-        else:
-            return 1
+        return PORT_PRIORITY[port]
+
+    def _in_range(self, port):
+        return self.start_port <= port <= self.end_port
     
     def bfs_traversal(self):
-        """Breadth-First Search traversal for port scanning"""
-        queue = deque()
-        traversal_order = []
-        
-        # Group ports by priority levels
-        priority_groups = {}
-        for port in range(self.start_port, self.end_port + 1):
-            priority = self.get_priority_score(port)
-            if priority not in priority_groups:
-                priority_groups[priority] = []
-            priority_groups[priority].append(port)
-        
-        # BFS: Add ports to queue in priority order (highest first)
-        for priority in sorted(priority_groups.keys(), reverse=True):
-            ports = priority_groups[priority]
+        """Breadth-First Search traversal for port scanning, yielded lazily by priority level"""
+        # Level prioritas tinggi: daftar kecil, diacak per level
+        for priority in sorted(PRIORITY_PORTS, reverse=True):
+            ports = [p for p in PRIORITY_PORTS[priority] if self._in_range(p)]
             random.shuffle(ports)
-            for port in ports:
-                queue.append(port)
+            yield from ports
         
-        # BFS traversal
-        while queue:
-            current_port = queue.popleft()
-            if current_port not in self.visited:
-                self.visited.add(current_port)
-                traversal_order.append(current_port)
-        
-        return traversal_order
+        # Sisanya (prioritas default) diacak tanpa membuat list seluruh range
+        for port in _permuted_range(self.start_port, self.end_port):
+            if PORT_PRIORITY[port] == DEFAULT_PRIORITY:
+                yield port
     
     def dfs_traversal(self):
         """Depth-First Search traversal for port scanning"""
-        stack = []
-        traversal_order = []
-        
         # Start with critical services and explore related ports deeply
         service_clusters = [
             PORT_GROUPS['critical'],
@@ -244,212 +165,213 @@ class PortTraversal:
             PORT_GROUPS['development']
         ]
         
-        # Add remaining ports
-        all_clustered = set()
+        # visited hanya berisi port cluster dan port terkait, bukan seluruh range
         for cluster in service_clusters:
-            all_clustered.update(cluster)
-        
-        remaining_ports = []
-        for port in range(self.start_port, self.end_port + 1):
-            if port not in all_clustered:
-                remaining_ports.append(port)
-        
-        # Build DFS stack (reverse order since stack is LIFO)
-        for cluster in reversed(service_clusters):
-            cluster_ports = [p for p in cluster if self.start_port <= p <= self.end_port]
-            for port in reversed(sorted(cluster_ports)):
-                stack.append(port)
+            stack = [p for p in sorted(cluster, reverse=True) if self._in_range(p)]
+            while stack:
+                current_port = stack.pop()
+                if current_port not in self.visited:
+                    self.visited.add(current_port)
+                    yield current_port
+                    self._add_related_ports(current_port, stack)
         
         # Add remaining ports
-        for port in reversed(remaining_ports):
-            stack.append(port)
-        
-        # DFS traversal
-        while stack:
-            current_port = stack.pop()
-            if current_port not in self.visited:
-                self.visited.add(current_port)
-                traversal_order.append(current_port)
-                self._add_related_ports(current_port, stack)
-        
-        return traversal_order
+        for port in range(self.start_port, self.end_port + 1):
+            if port not in self.visited:
+                yield port
     
     def _add_related_ports(self, port, stack):
         """Add ports related to the current service to the stack"""
-        # For web services, add common alternative ports
-        if port in [80, 443]:
-            related = [8080, 8443, 8000, 3000] if port == 80 else [8443, 8080]
-            for related_port in related:
-                if (self.start_port <= related_port <= self.end_port and 
-                    related_port not in self.visited):
-                    stack.append(related_port)
-        
-        # For database services, add related ports
-        elif port == 3306:  # MySQL
-            related = [3307, 33060]
-            for related_port in related:
-                if (self.start_port <= related_port <= self.end_port and 
-                    related_port not in self.visited):
-                    stack.append(related_port)
-        
-        # For SSH, add alternative ports
-        elif port == 22:
-            related = [2222, 22222]
-            for related_port in related:
-                if (self.start_port <= related_port <= self.end_port and 
-                    related_port not in self.visited):
-                    stack.append(related_port)
-    
+        # Web -> port alternatif, MySQL -> X Protocol, SSH -> port alternatif
+        for related_port in RELATED_PORTS.get(port, ()):
+            if self._in_range(related_port) and related_port not in self.visited:
+                stack.append(related_port)
+
+    def mark_open(self, port, service=None):
+        """Feedback from the scan engine: port is open, promote the ports around it"""
+        self.discovered_services[port] = service or COMMON_SERVICES.get(port, 'Unknown')
+        # Port terkait dulu, lalu anggota grup layanan yang sama
+        self._add_related_ports(port, self.promoted)
+        for group_ports in PORT_GROUPS.values():
+            if port in group_ports:
+                for group_port in group_ports:
+                    if self._in_range(group_port) and group_port not in self.visited:
+                        self.promoted.append(group_port)
+
     def adaptive_traversal(self):
-        """Adaptive traversal that switches between BFS and DFS based on discoveries"""
-        traversal_order = []
-        
-        # Start with BFS for quick discovery of critical services
-        critical_ports = [p for p in PORT_GROUPS['critical'] 
-                         if self.start_port <= p <= self.end_port]
-        
-        # BFS phase for critical services
-        bfs_queue = deque(critical_ports)
-        while bfs_queue:
-            port = bfs_queue.popleft()
-            if port not in self.visited:
-                self.visited.add(port)
-                traversal_order.append(port)
-        
-        # If we found open ports, switch to DFS for deep exploration
-        if self.discovered_services:
-            dfs_remaining = [p for p in range(self.start_port, self.end_port + 1) 
-                           if p not in self.visited]
-            
-            # Group remaining ports by service type for DFS
-            for group_name, group_ports in PORT_GROUPS.items():
-                if group_name == 'critical':
+        """Adaptive traversal that reorders itself as the engine reports open ports"""
+        # Urutan dasar BFS (critical dulu), port yang dipromosikan menyela di depannya
+        for port in self.bfs_traversal():
+            while self.promoted:
+                promoted_port = self.promoted.popleft()
+                if promoted_port not in self.visited:
+                    self.visited.add(promoted_port)
+                    self.promoted_count += 1
+                    yield promoted_port
+            # visited hanya perlu port yang bisa dipromosikan, bukan seluruh range
+            if port in PROMOTABLE_PORTS:
+                if port in self.visited:
                     continue
-                    
-                group_remaining = [p for p in group_ports 
-                                 if p in dfs_remaining and p not in self.visited]
-                
-                # DFS within each group
-                stack = list(reversed(group_remaining))
-                while stack:
-                    port = stack.pop()
-                    if port not in self.visited:
-                        self.visited.add(port)
-                        traversal_order.append(port)
-        
-        # Add any remaining ports
-        for port in range(self.start_port, self.end_port + 1):
-            if port not in self.visited:
-                traversal_order.append(port)
-        
-        return traversal_order
+                self.visited.add(port)
+            yield port
 
-# --- Port Scanning Functions ---
-def grab_banner(target_ip, port):
-    """Attempt to grab banner from a service"""
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.settimeout(2)
-        s.connect((target_ip, port))
-        
-        # Try to receive banner first (for services that send greeting)
-        banner = s.recv(1024)
-        
-        # If no banner received, try HTTP probes for web services
-        if not banner and port in [80, 443, 8080, 8443, 8000, 3000, 9000]:
-            try:
-                probe = HTTP_PROBES[0].replace(b'{host}', target_ip.encode())
-                s.send(probe)
-                banner = s.recv(1024)
-            except:
-                pass
-        
-        # If still no banner, try generic probes
-        if not banner:
-            try:
-                s.send(b'\r\n\r\n')
-                banner = s.recv(1024)
-            except:
-                pass
-        
-        s.close()
-        return banner
-    except:
-        return None
+TRAVERSAL_METHODS = {
+    "bfs": PortTraversal.bfs_traversal,
+    "dfs": PortTraversal.dfs_traversal,
+    "adaptive": PortTraversal.adaptive_traversal
+}
 
-def identify_service(banner, port):
-    """Identify service based on banner and port"""
-    if not banner:
-        return COMMON_SERVICES.get(port, 'Unknown')
-    
-    banner_lower = banner.lower()
-    
-    # Check fingerprint database
-    for fingerprint, service in SERVICE_FINGERPRINTS.items():
-        if fingerprint.lower() in banner_lower:
-            return service
-    
-    # Special cases based on port and banner content
-    if port == 25 and b'220' in banner:
-        return 'SMTP'
-    elif port == 110 and b'+OK' in banner:
-        return 'POP3'
-    elif port == 143 and b'* OK' in banner:
-        return 'IMAP'
-    elif port in [80, 8080, 3000, 8000] and b'http' in banner_lower:
-        return 'HTTP'
-    elif port in [443, 8443] and (b'http' in banner_lower or b'ssl' in banner_lower):
-        return 'HTTPS'
-    elif port == 22 and b'ssh' in banner_lower:
-        return 'SSH'
-    elif port == 21 and b'ftp' in banner_lower:
-        return 'FTP'
-    elif port == 23 and (b'telnet' in banner_lower or b'login:' in banner_lower):
-        return 'Telnet'
-    
-    # Fallback to common services
-    return COMMON_SERVICES.get(port, 'Unknown')
+def make_scan_order(traversal_obj, traversal):
+    """Lazy port order for one host; every host gets its own PortTraversal and generator"""
+    method = TRAVERSAL_METHODS.get(traversal, PortTraversal.bfs_traversal)
+    return method(traversal_obj)
+
+def verification_ports(baseline, target_ip, start_port, end_port):
+    """Baseline open ports of target_ip, then the high-priority ports, inside the scan range"""
+    ports = []
+    if baseline:
+        ports.extend(detail["port"] for detail in baseline["hosts"].get(target_ip, []))
+    for priority in sorted(PRIORITY_PORTS, reverse=True):
+        ports.extend(PRIORITY_PORTS[priority])
+    seen = set()
+    return [port for port in ports
+            if start_port <= port <= end_port and not (port in seen or seen.add(port))]
+
+def diff_against_baseline(baseline, details_by_host, checkpoint):
+    """newly_open / closed / changed ports versus the baseline, over ports this scan covered"""
+    newly_open, closed, changed = [], [], []
+    unchanged = 0
+    for target_ip, details in details_by_host.items():
+        before = {detail["port"]: detail for detail in baseline["hosts"].get(target_ip, [])}
+        after = {detail["port"]: detail for detail in details}
+        for port, detail in sorted(after.items()):
+            if port not in before:
+                newly_open.append({"host": target_ip, "port": port, "service": detail["service"]})
+                continue
+            changes = [field for field in ("service", "banner")
+                       if before[port].get(field) != detail.get(field)]
+            if changes:
+                changed.append({
+                    "host": target_ip,
+                    "port": port,
+                    "changes": changes,
+                    "before": {field: before[port].get(field) for field in ("service", "banner")},
+                    "after": {field: detail.get(field) for field in ("service", "banner")}
+                })
+            else:
+                unchanged += 1
+        for port, detail in sorted(before.items()):
+            # Port di luar range atau yang tidak sempat diprobe (time_budget) bukan "closed"
+            if port in after or not checkpoint.covers(target_ip, port):
+                continue
+            closed.append({"host": target_ip, "port": port, "service": detail["service"]})
+    return {
+        "baseline_scan_id": baseline["scan_id"],
+        "newly_open": newly_open,
+        "closed": closed,
+        "changed": changed,
+        "unchanged_count": unchanged
+    }
+
+def _timed_ports(ports, phases):
+    """Pass ports through, charging the time spent generating them to the traversal phase"""
+    ports = iter(ports)
+    while True:
+        started = time.perf_counter()
+        port = next(ports, None)
+        phases.add("traversal", time.perf_counter() - started)
+        if port is None:
+            return
+        yield port
 
-def resolve_target(target):
-    """Resolve target hostname to IP address"""
+def _record_preview(ports, preview, limit=10):
+    """Pass ports through, copying the first few into preview"""
+    for port in ports:
+        if len(preview) < limit:
+            preview.append(port)
+        yield port
+
+# --- Port Scanning Functions ---
+def _recv_banner(s):
+    """Reply to a probe: bytes, b'' when the peer closed, None on timeout"""
     try:
-        return socket.gethostbyname(target)
-    except socket.gaierror:
+        return s.recv(1024)
+    except socket.timeout:
         return None
+    except OSError:
+        return b''
+
+def probe_service(target_ip, port, s):
+    """Walk the port's probe plan on a connected socket: (banner, (service, info) or None)"""
+    banner = None
+    for probe in PROBE_DB.plan(port):
+        payload = probe_payload(probe, target_ip)
+        if payload:
+            try:
+                s.sendall(payload)
+            except OSError:
+                break
+        response = _recv_banner(s)
+        if response is None:
+            continue
+        if not response:
+            # Service menutup koneksi, probe berikutnya tidak akan terbaca
+            break
+        matched = PROBE_DB.match(probe, response, port)
+        if matched:
+            return response, matched
+        banner = banner or response
+    return banner, None
 
-def scan_tcp(ip, port, fingerprint_enabled=False):
-    """Enhanced TCP scan with optional fingerprinting"""
+def connect_tcp(ip, port, timing=None):
+    """Discovery stage: the connected socket when port is open, else None"""
+    s = None
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(0.5)
-            result = s.connect_ex((ip, port))
-            if result == 0:
-                port_info = {
-                    "port": port,
-                    "status": "open",
-                    "service": COMMON_SERVICES.get(port, 'Unknown'),
-                    "banner": None
-                }
-                
-                # Perform banner grabbing if fingerprinting is enabled
-                if fingerprint_enabled:
-                    banner = grab_banner(ip, port)
-                    if banner:
-                        service = identify_service(banner, port)
-                        port_info["service"] = service
-                        port_info["banner"] = banner[:100].decode('utf-8', errors='ignore').strip()
-                    else:
-                        port_info["banner"] = "No banner"
-                
-                return port_info
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.settimeout(timing.connect_timeout() if timing else CONNECT_TIMEOUT)
+        started = time.monotonic()
+        result = s.connect_ex((ip, port))
+        if timing:
+            if result in (0, errno.ECONNREFUSED):
+                timing.observe(time.monotonic() - started, refused=result == errno.ECONNREFUSED)
+            elif result in (errno.EAGAIN, errno.ETIMEDOUT):
+                timing.record_timeout(port)
+            elif result in RESOURCE_ERRNOS:
+                timing.record_resource_error(port)
+        if result == 0:
+            return s
+    except OSError as e:
+        if timing and e.errno in RESOURCE_ERRNOS:
+            timing.record_resource_error(port)
     except:
         pass
+    if s is not None:
+        s.close()
     return None
 
-def scan_syn(ip, port, fingerprint_enabled=False):
-    """Simplified SYN scan without scapy dependency"""
-    # Fallback to TCP scan if scapy is not available
-    return scan_tcp(ip, port, fingerprint_enabled)
+def fingerprint_tcp(ip, port, s, timing=None):
+    """Fingerprint stage: banner-grab on the socket connect_tcp opened, then close it"""
+    port_info = open_port_info(port)
+    try:
+        # Banner grabbing on the same connection, no second handshake
+        banner_timeout = timing.banner_timeout() if timing else BANNER_TIMEOUT
+        banner_started = time.monotonic()
+        s.settimeout(banner_timeout)
+        banner, matched = probe_service(ip, port, s)
+        if timing:
+            timing.observe_banner(time.monotonic() - banner_started)
+        if banner:
+            describe_banner(port_info, banner, matched)
+        else:
+            port_info["banner"] = "No banner"
+    finally:
+        s.close()
+    return port_info
+
+# Interval frame progress pada endpoint streaming (detik)
+STREAM_PROGRESS_INTERVAL = 0.5
+
+RISK_ORDER = {'High': 3, 'Medium': 2, 'Low': 1, 'Safe': 0}
 
 def assess_risk_level(open_ports):
     """Assess risk level based on open ports"""
@@ -468,109 +390,636 @@ def assess_risk_level(open_ports):
     else:
         return "Safe"
 
-# --- Enhanced Routes ---
-@scanner_bp.route("/scan", methods=["POST"])
-def scan():
+def _paced_call(delay, func, *args):
+    """Sleep out the pacer's delay inside the worker, then probe"""
+    if delay > 0:
+        time.sleep(delay)
+    return func(*args)
+
+def _run_threaded_scan(scheduler, fingerprint_enabled, timings):
+    """Connect sweep and banner grabbing as two thread pools joined by a bounded hand-off"""
+    results = []
+    pipeline = scheduler.pipeline or FingerprintPipeline.threaded()
+    # Pool connect seukuran batas atas, jumlah probe in-flight mengikuti jendela yang sedang berlaku
+    with ThreadPoolExecutor(max_workers=scheduler.max_concurrency) as connect_pool, \
+         ThreadPoolExecutor(max_workers=pipeline.workers) as fingerprint_pool:
+        connecting = {}
+        fingerprinting = {}
+        try:
+            while True:
+                while len(connecting) < scheduler.concurrency:
+                    if not pipeline.admits(len(connecting), scheduler.concurrency):
+                        # Banner lambat menahan sapuan, bukan menumpuk socket terbuka tanpa batas
+                        pipeline.stall()
+                        break
+                    probe = scheduler.next_probe()
+                    if probe is None:
+                        break
+                    ip, port = probe
+                    future = connect_pool.submit(_paced_call, scheduler.pace(ip), connect_tcp,
+                                                 ip, port, timings.get(ip))
+                    connecting[future] = probe
+
+                if not connecting and not fingerprinting:
+                    break
+                done, _ = wait(list(connecting) + list(fingerprinting), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fingerprinting:
+                        ip, port = fingerprinting.pop(future)
+                        pipeline.complete()
+                        # Port tetap terbuka walau banner gagal dibaca
+                        port_info = open_port_info(port) if future.exception() else future.result()
+                        scheduler.finish(ip, port, port_info)
+                        results.append((ip, port_info))
+                        continue
+
+                    ip, port = connecting.pop(future)
+                    sock = future.result()
+                    if sock is None:
+                        scheduler.done(ip, port)
+                        continue
+                    # Slot connect langsung bebas, port terbuka mengalir ke tahap fingerprint
+                    port_info = open_port_info(port)
+                    scheduler.release(ip, port_info)
+                    if not fingerprint_enabled:
+                        sock.close()
+                        scheduler.finish(ip, port, port_info)
+                        results.append((ip, port_info))
+                        continue
+                    pipeline.hand_off()
+                    fingerprinting[fingerprint_pool.submit(fingerprint_tcp, ip, port, sock,
+                                                           timings.get(ip))] = (ip, port)
+        finally:
+            if pipeline is not scheduler.pipeline:
+                pipeline.close()
+    return results
+
+def run_scan_engine(mode, scheduler, fingerprint_enabled, timings, processes=SHARD_DEFAULT_PROCESSES):
+    """Run one pass over the scheduler's probes, returns (engine, [(ip, port_info)])"""
+    if mode == "udp":
+        # Payload per protokol dari beberapa socket bersama, retry di dalam scanner
+        results, states, unreachable = run_udp_scan(scheduler.drain(), scheduler.pacing, fingerprint_enabled)
+        # ICMP port unreachable = closed, port yang diam saja (open|filtered) dicatat filtered
+        scheduler.record(states)
+        scheduler.unreachable.update(unreachable)
+        for ip, port_info in results:
+            scheduler.found(ip, port_info)
+        return "udp", results
+
+    if mode == "sharded":
+        # Satu event loop per proses, melewati batas GIL
+        return "sharded-asyncio", run_sharded_scan(scheduler, fingerprint_enabled, timings, processes)
+
+    if mode == "async":
+        # Event loop tunggal, ribuan koneksi berjalan bersamaan
+        return "asyncio-connect", run_async_scan(scheduler, fingerprint_enabled, timings)
+
+    if mode == "syn" and has_raw_socket_capability():
+        # Half-open scan, hanya port yang terbuka yang disentuh lagi untuk banner
+        open_probes, states, unreachable = run_syn_scan(scheduler.drain(), pacing=scheduler.pacing)
+        scheduler.record(states)
+        scheduler.unreachable.update(unreachable)
+        if fingerprint_enabled:
+            banner_scheduler = TargetScheduler(_group_ports(open_probes), min(scheduler.concurrency, 100),
+                                               pipeline=scheduler.pipeline)
+            results = _run_threaded_scan(banner_scheduler, True, timings)
+        else:
+            results = [(ip, open_port_info(port)) for ip, port in open_probes]
+        for ip, port_info in results:
+            scheduler.found(ip, port_info)
+        return "raw-syn", results
+
+    # Tanpa raw socket, SYN mode jatuh ke connect scan biasa
+    return "threaded-connect", _run_threaded_scan(scheduler, fingerprint_enabled, timings)
+
+def _group_ports(probes):
+    """[(ip, port)] -> [(ip, [ports])] keeping first-seen host order"""
+    grouped = {}
+    for ip, port in probes:
+        grouped.setdefault(ip, []).append(port)
+    return list(grouped.items())
+
+def resolve_targets(hosts):
+    """Resolve every host, returns ([(host, ip)], [unresolvable hosts])"""
+    resolved = []
+    failed = []
+    seen = set()
+    # Semua nama di-resolve paralel, hasilnya di-cache sesuai TTL
+    addresses = RESOLVER.resolve_many(hosts)
+    for host in hosts:
+        ip = addresses[host]["ipv4"][0] if addresses[host] and addresses[host]["ipv4"] else None
+        if not ip:
+            failed.append(host)
+        elif ip not in seen:
+            seen.add(ip)
+            resolved.append((host, ip))
+    return resolved, failed
+
+def _number_param(data, key, unit, cast=float, allow_zero=False):
+    """Optional numeric field of a /scan body, returns (value or None, error)"""
+    value = data.get(key)
+    if value is None:
+        return None, None
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        value = -1
+    if value < 0 or (value == 0 and not allow_zero):
+        kind = "non-negative" if allow_zero else "positive"
+        return None, f"{key} must be a {kind} number of {unit}"
+    return value, None
+
+def _port_range(data):
+    """start_port/end_port of a /scan body, returns ((start, end) or None, error)"""
     try:
-        data = request.json
-        ip = data.get("ip")
         start_port = int(data.get("start_port", 1))
         end_port = int(data.get("end_port", 100))
-        mode = data.get("mode", "tcp")
-        traversal = data.get("traversal", "bfs")
-        threads = int(data.get("threads", 50))
-        fingerprint_enabled = data.get("fingerprint", True)
+    except (TypeError, ValueError):
+        return None, "start_port and end_port must be integers"
+    if not MIN_PORT <= start_port <= end_port <= MAX_PORT:
+        return None, f"Port range must satisfy {MIN_PORT} <= start_port <= end_port <= {MAX_PORT}"
+    return (start_port, end_port), None
 
-        if not ip:
-            return jsonify({"error": "Target IP address is required"}), 400
+def find_scan_result(scan_id):
+    """Finished scan_result from history, or None"""
+    with history_lock:
+        history = scan_histories.get("default_user", [])
+        return next((scan for scan in history if scan['scan_id'] == scan_id), None)
 
-        # Validate IP format and resolve hostname if needed
-        target_ip = resolve_target(ip)
-        if not target_ip:
-            return jsonify({"error": f"Cannot resolve hostname '{ip}'"}), 400
+def _baseline_config(baseline):
+    """Open ports of a previous scan per resolved IP, kept JSON-friendly for checkpoints"""
+    hosts = baseline.get("hosts") or [{
+        "resolved_ip": baseline["resolved_ip"],
+        "port_details": baseline["port_details"]
+    }]
+    return {
+        "scan_id": baseline["scan_id"],
+        "hosts": {host["resolved_ip"]: [{
+            "port": detail["port"],
+            "service": detail.get("service"),
+            "banner": detail.get("banner")
+        } for detail in host["port_details"]] for host in hosts}
+    }
 
-        # Generate unique scan ID
-        scan_id = str(uuid.uuid4())[:8]
-        scan_start_time = datetime.now()
+def parse_scan_request(data):
+    """Validate a /scan body and resolve its targets, returns (config, error)"""
+    # Rescan diferensial: target, range dan mode default-nya diambil dari scan baseline
+    baseline = None
+    baseline_id = data.get("baseline_scan_id")
+    if baseline_id:
+        baseline = find_scan_result(baseline_id)
+        if not baseline:
+            return None, f"Baseline scan '{baseline_id}' not found"
+        data = dict({
+            "ip": baseline["target"],
+            "start_port": baseline["start_port"],
+            "end_port": baseline["end_port"],
+            "mode": baseline["mode"],
+            "fingerprint": baseline["fingerprint_enabled"]
+        }, **data)
 
-        # Initialize traversal
-        traversal_obj = PortTraversal(start_port, end_port)
-        
-        # Generate scan order based on traversal method - SEQUENTIAL REMOVED
-        if traversal == "bfs":
-            scan_order = traversal_obj.bfs_traversal()
-        elif traversal == "dfs":
-            scan_order = traversal_obj.dfs_traversal()
-        elif traversal == "adaptive":
-            scan_order = traversal_obj.adaptive_traversal()
-        else:  # default to bfs if invalid method provided
-            scan_order = traversal_obj.bfs_traversal()
-            traversal = "bfs"  # Update traversal name to reflect actual method used
-
-        # Select scan function
-        scan_func = scan_tcp
-        if mode == "syn":
-            scan_func = scan_syn
-
-        open_ports = []
-        port_details = []
-        
-        with ThreadPoolExecutor(max_workers=min(threads, 100)) as executor:
-            if fingerprint_enabled:
-                results = executor.map(lambda p: scan_func(target_ip, p, True), scan_order)
-            else:
-                results = executor.map(lambda p: scan_func(target_ip, p, False), scan_order)
-            
-            for result in results:
-                if result:
-                    open_ports.append(result["port"])
-                    port_details.append(result)
+    ip = data.get("targets") or data.get("ip")
+    if not ip:
+        return None, "Target IP address is required"
 
-        scan_end_time = datetime.now()
-        scan_duration = (scan_end_time - scan_start_time).total_seconds()
+    port_range, error = _port_range(data)
+    if error:
+        return None, error
 
-        # Ensure consistent results regardless of traversal method
-        open_ports.sort()  # Sort for consistency
-        port_details.sort(key=lambda x: x["port"])  # Sort by port number
-
-        # Assess risk level
-        risk_level = assess_risk_level(open_ports)
-
-        # Calculate traversal statistics
-        traversal_stats = {
-            "total_ports_scanned": len(scan_order),
-            "success_rate": round((len(open_ports) / len(scan_order)) * 100, 2) if scan_order else 0,
-            "method_used": traversal,
-            "scan_order_preview": scan_order[:10] if len(scan_order) > 10 else scan_order
-        }
+    # CIDR, range (10.0.0.1-20) dan daftar host dipecah jadi host tunggal
+    try:
+        hosts = parse_targets(ip)
+    except TargetError as e:
+        return None, str(e)
+    if not hosts:
+        return None, "Target IP address is required"
+
+    # Validate IP format and resolve hostname if needed
+    resolve_started = time.perf_counter()
+    targets, unresolved = resolve_targets(hosts)
+    resolve_time = time.perf_counter() - resolve_started
+    if not targets:
+        return None, f"Cannot resolve hostname '{', '.join(unresolved)}'"
+
+    # Batas waktu opsional: scan berhenti mengirim probe baru setelah sekian detik
+    time_budget, error = _number_param(data, "time_budget", "seconds")
+    if error:
+        return None, error
+
+    # Laju per scan (probe/detik) di bawah anggaran global, UDP selalu dibatasi
+    mode = data.get("mode", "tcp")
+    if data.get("rate") is None and mode == "udp":
+        data = dict(data, rate=UDP_DEFAULT_RATE)
+    rate, error = _number_param(data, "rate", "probes per second", cast=int)
+    if error:
+        return None, error
+    if rate:
+        rate = min(rate, PACER.global_rate)
+        if mode == "udp":
+            rate = min(rate, UDP_MAX_RATE)
+
+    # Sisa range setelah port baseline dan port prioritas boleh disapu lebih pelan
+    sweep_rate, error = _number_param(data, "sweep_rate", "probes per second", cast=int)
+    if error:
+        return None, error
+    if sweep_rate:
+        sweep_rate = min(sweep_rate, PACER.global_rate)
+        if mode == "udp":
+            sweep_rate = min(sweep_rate, UDP_MAX_RATE)
+
+    # Port yang diperiksa dalam max_age detik terakhir diambil dari cache
+    max_age, error = _number_param(data, "max_age", "seconds", allow_zero=True)
+    if error:
+        return None, error
+
+    # Batas atas concurrency; kosong atau 0 = diatur otomatis
+    threads, error = _number_param(data, "threads", "threads", cast=int, allow_zero=True)
+    if error:
+        return None, error
+    concurrency, error = _number_param(data, "concurrency", "connections", cast=int, allow_zero=True)
+    if error:
+        return None, error
+
+    # Jumlah proses mode sharded, dibatasi ke jumlah core
+    processes, error = _number_param(data, "processes", "worker processes", cast=int)
+    if error:
+        return None, error
+
+    # Retry per port; RttEstimator membatasinya ke MAX_RETRIES
+    retries, error = _number_param(data, "retries", "extra attempts", cast=int, allow_zero=True)
+    if error:
+        return None, error
+
+    # Host discovery hanya untuk multi-target (default aktif), target tunggal selalu di-scan
+    discovery = len(targets) > 1 and data.get("discovery", True)
+
+    config = {
+        "target": ip if isinstance(ip, str) else ", ".join(hosts),
+        "targets": targets,
+        "unresolved": unresolved,
+        "start_port": port_range[0],
+        "end_port": port_range[1],
+        "mode": mode,
+        "traversal": data.get("traversal", "bfs"),
+        # None = concurrency diatur otomatis, angka = batas atas dan titik awal
+        "threads": threads or None,
+        "fingerprint_enabled": data.get("fingerprint", True),
+        "concurrency": concurrency or None,
+        "processes": min(processes or SHARD_DEFAULT_PROCESSES, SHARD_MAX_PROCESSES),
+        "retries": DEFAULT_RETRIES if retries is None else retries,
+        "rate": rate,
+        "time_budget": time_budget,
+        "max_age": max_age,
+        "sweep_rate": sweep_rate,
+        "discovery": bool(discovery),
+        "icmp": bool(data.get("icmp", False)),
+        "resolve_time": round(resolve_time, 4),
+        "baseline": _baseline_config(baseline) if baseline else None
+    }
+    return config, None
+
+def coalesce_key(config):
+    """Identical requests with the same key attach to one running scan instead of sweeping again"""
+    baseline = config.get("baseline")
+    return (tuple(target_ip for _, target_ip in config["targets"]), config["start_port"], config["end_port"],
+            config["mode"], bool(config["fingerprint_enabled"]),
+            # Batas waktu dan baseline mengubah isi hasil, bukan hanya cara scan berjalan
+            config.get("time_budget"), baseline["scan_id"] if baseline else None)
+
+def share_scan_result(scan_result, scan_id, config):
+    """Copy of a finished scan_result under scan_id for a request that attached to it, saved to history"""
+    shared = dict(scan_result, scan_id=scan_id, target=config["target"], coalesced_with=scan_result["scan_id"])
+    save_scan_result(shared)
+    return shared
+
+def count_scan_ports(config):
+    """Total first-pass probes a scan config will send"""
+    ports = max(0, config["end_port"] - config["start_port"] + 1)
+    return ports * len(config["targets"])
+
+def execute_scan(config, scan_id, progress=None, checkpoint=None):
+    """Run a parsed scan config (or resume its checkpoint), store it in history and return scan_result"""
+    target = config["target"]
+    targets = config["targets"]
+    start_port = config["start_port"]
+    end_port = config["end_port"]
+    mode = config["mode"]
+    traversal = config["traversal"]
+    threads = config["threads"]
+    fingerprint_enabled = config["fingerprint_enabled"]
+    concurrency = config["concurrency"]
+    processes = min(max(1, config["processes"]), SHARD_MAX_PROCESSES)
+
+    scan_start_time = datetime.now()
+    # Waktu per fase, dijumlahkan ke scan_result dan ke sena_scan_phase_seconds_total
+    phases = PhaseTimer()
+    phases.add("resolve", config.get("resolve_time") or 0)
+    time_budget = config.get("time_budget")
+    deadline = time.monotonic() + time_budget if time_budget else None
+
+    # Generate scan order based on traversal method - SEQUENTIAL REMOVED
+    if traversal not in TRAVERSAL_METHODS:
+        traversal = "bfs"  # default to bfs if invalid method provided
+
+    ports_per_host = max(0, end_port - start_port + 1)
+    # Urutan port dibuat lazy per host, hanya 10 port pertama yang dicatat
+    scan_order_preview = []
+
+    # Jendela probe in-flight mulai kecil dan tumbuh selama target menjawab cepat,
+    # angka dari request menjadi batas atas sekaligus titik awal
+    if mode in ("async", "sharded"):
+        ceiling = clamp_concurrency(concurrency or ASYNC_MAX_CONCURRENCY)
+        initial = ceiling if concurrency else ASYNC_INITIAL_CONCURRENCY
+    else:
+        ceiling = min(threads or THREADED_MAX_CONCURRENCY, THREADED_MAX_CONCURRENCY)
+        initial = ceiling if threads else THREADED_INITIAL_CONCURRENCY
+
+    # Probe yang selesai dicatat berkala ke disk, scan bisa dilanjutkan setelah restart
+    if checkpoint is None:
+        # Checkpoint scan yang ditinggalkan dibersihkan setiap ada scan baru
+        prune_checkpoints()
+        checkpoint = ScanCheckpoint(scan_id, config)
+
+    # Host yang mati tidak perlu disapu port demi port sampai timeout
+    skipped_hosts = []
+    discovery_started = time.perf_counter()
+    # Target tunggal tidak pernah di-skip, apa pun isi config-nya
+    if config.get("discovery") and len(targets) > 1:
+        # Host yang sudah punya probe di checkpoint pasti sudah lolos discovery sebelumnya
+        unknown = [target_ip for _, target_ip in targets if not checkpoint.done_count[target_ip]]
+        alive, _ = discover_hosts(unknown, icmp=config.get("icmp"))
+        alive = set(alive)
+        for host, target_ip in targets:
+            if target_ip in unknown and target_ip not in alive:
+                skipped_hosts.append({"target": host, "resolved_ip": target_ip, "reason": "no-response"})
+        if skipped_hosts:
+            skipped_ips = {host["resolved_ip"] for host in skipped_hosts}
+            targets = [target for target in targets if target[1] not in skipped_ips]
+            if progress:
+                progress.skip(ports_per_host * len(skipped_hosts))
+    phases.add("discovery", time.perf_counter() - discovery_started)
+
+    resumed_results = checkpoint.found_results()
+    resumed_done = dict(checkpoint.done_count)
+
+    # Hasil cache yang masih segar dianggap sudah diprobe, sisanya di-scan
+    max_age = config.get("max_age")
+    cache_hits = {target_ip: 0 for _, target_ip in targets}
+    cached_results = []
+    cache_started = time.perf_counter()
+    if max_age is not None:
+        for _, target_ip in targets:
+            cached, cached_details = RESULT_CACHE.lookup(target_ip, mode, fingerprint_enabled,
+                                                         start_port, end_port, max_age)
+            for port, state in cached.ports():
+                if checkpoint.is_done(target_ip, port):
+                    continue
+                cache_hits[target_ip] += 1
+                port_info = cached_details.get(port)
+                checkpoint.mark(target_ip, port, port_info, state)
+                if port_info:
+                    port_info = dict(port_info, cached=True)
+                    cached_results.append((target_ip, port_info))
+                if progress:
+                    progress.probe_done(target_ip, port_info)
+    probed_before = checkpoint.snapshot_done()
+    phases.add("cache_lookup", time.perf_counter() - cache_started)
+    checkpoint.save()
+    probe_started_at = time.time()
+
+    # Setiap host punya traversal sendiri, port terbuka dilaporkan balik ke sana
+    with phases.phase("traversal"):
+        traversals = {target_ip: PortTraversal(start_port, end_port) for _, target_ip in targets}
+        scan_phases = [{target_ip: make_scan_order(traversals[target_ip], traversal)
+                        for _, target_ip in targets}]
+
+    # Rescan diferensial: port terbuka di baseline dan port prioritas diverifikasi dulu,
+    # sisa range menyusul (bisa dengan sweep_rate yang lebih pelan)
+    baseline = config.get("baseline")
+    sweep_rate = config.get("sweep_rate")
+    if baseline or sweep_rate:
+        scan_phases.insert(0, {target_ip: verification_ports(baseline, target_ip, start_port, end_port)
+                               for _, target_ip in targets})
+
+    def on_open(target_ip, port_info):
+        traversals[target_ip].mark_open(port_info["port"], port_info.get("service"))
+
+    # Semua probe scan ini mengambil slot dari pacer global proses
+    pacing = ScanPacing(PACER, config["rate"])
+    # Socket diambil dari anggaran FD proses, dikembalikan saat scan selesai
+    controller = ConcurrencyController(initial, ceiling)
+    # Port terbuka menunggu banner di antrean terbatas, terpisah dari sapuan connect
+    pipeline = FingerprintPipeline.event_loop() if mode in ("async", "sharded") else FingerprintPipeline.threaded()
+    workers = controller.limit
+    # Per-target RTT estimator, timeouts menyesuaikan selama scan berjalan
+    timings = {target_ip: RttEstimator(config["retries"], controller) for _, target_ip in targets}
+    dispatched = {target_ip: 0 for _, target_ip in targets}
+    unreachable = set()
+    engine = None
+    results = []
+    try:
+        probing_started = time.perf_counter()
+        traversal_before = phases.phases.get("traversal", 0)
+        for index, phase in enumerate(scan_phases):
+            if index and sweep_rate:
+                pacing.set_rate(sweep_rate)
+            # Port yang sudah selesai (checkpoint, cache, fase sebelumnya) dilewati
+            host_orders = [(target_ip, checkpoint.remaining(target_ip, _timed_ports(ports, phases)))
+                           for target_ip, ports in phase.items()]
+            if host_orders:
+                first_ip, first_order = host_orders[0]
+                host_orders[0] = (first_ip, _record_preview(first_order, scan_order_preview))
+
+            # Scheduler menyelang-nyeling probe antar host
+            scheduler = TargetScheduler(host_orders, workers, progress, on_open=on_open,
+                                        deadline=deadline, pacing=pacing, checkpoint=checkpoint,
+                                        controller=controller, pipeline=pipeline)
+            phase_engine, phase_results = run_scan_engine(mode, scheduler, fingerprint_enabled,
+                                                          timings, processes)
+            engine = engine or phase_engine
+            results.extend(phase_results)
+            for target_ip, count in scheduler.dispatched.items():
+                dispatched[target_ip] += count
+            unreachable.update(scheduler.unreachable)
+            if scheduler.expired:
+                break
+        # Waktu generate urutan port terjadi di dalam probing, dipisah supaya fase tidak tumpang tindih
+        traversal_during = phases.phases.get("traversal", 0) - traversal_before
+        phases.add("probing", time.perf_counter() - probing_started - traversal_during)
+
+        # Port yang timeout dicoba ulang dengan timeout yang lebih longgar
+        retries_started = time.perf_counter()
+        for _ in range(max((timing.max_retries for timing in timings.values()), default=0)):
+            if scheduler.expired:
+                break
+            retry_probes = []
+            for target_ip, timing in timings.items():
+                retry_ports = timing.pop_timeouts()
+                if retry_ports:
+                    timing.back_off(len(retry_ports))
+                    retry_probes.append((target_ip, retry_ports))
+            if not retry_probes:
+                break
+            retry_scheduler = TargetScheduler(retry_probes, workers, progress, retry=True,
+                                              deadline=deadline, pacing=pacing, checkpoint=checkpoint,
+                                              controller=controller, pipeline=pipeline)
+            _, retried = run_scan_engine(mode, retry_scheduler, fingerprint_enabled, timings, processes)
+            results.extend(retried)
+        phases.add("retries", time.perf_counter() - retries_started)
+        # Tetap tanpa jawaban setelah semua retry = filtered, bukan closed
+        for target_ip, timing in timings.items():
+            checkpoint.mark_filtered(target_ip, timing.unanswered())
+    except Exception:
+        checkpoint.save()
+        raise
+    finally:
+        controller.close()
+        pipeline.close()
+    results = resumed_results + cached_results + results
+    finalize_started = time.perf_counter()
+
+    # Semua port yang benar-benar diprobe pada run ini masuk cache
+    for _, target_ip in targets:
+        probed, probed_details = checkpoint.probed_since(target_ip, probed_before)
+        RESULT_CACHE.store(target_ip, mode, fingerprint_enabled, probed, probed_details, probe_started_at)
+
+    scan_end_time = datetime.now()
+    scan_duration = (scan_end_time - scan_start_time).total_seconds()
+
+    # Hasil dikelompokkan per host
+    details_by_host = {target_ip: [] for _, target_ip in targets}
+    for target_ip, port_info in results:
+        details_by_host[target_ip].append(port_info)
 
-        scan_result = {
-            "scan_id": scan_id,
-            "target": ip,
+    host_results = []
+    for host, target_ip in targets:
+        # Ensure consistent results regardless of traversal method
+        host_details = sorted(details_by_host[target_ip], key=lambda x: x["port"])
+        host_open_ports = [detail["port"] for detail in host_details]
+        host_scanned = dispatched[target_ip] + resumed_done[target_ip] + cache_hits[target_ip]
+        # Port tanpa jawaban (timeout di semua retry) dihitung terpisah dari yang menolak
+        host_filtered = checkpoint.counts(target_ip)["filtered"]
+        host_results.append({
+            "target": host,
             "resolved_ip": target_ip,
-            "mode": mode,
-            "traversal": traversal,
-            "threads": threads,
-            "fingerprint_enabled": fingerprint_enabled,
-            "port_range": f"{start_port}-{end_port}",
-            "start_port": start_port,
-            "end_port": end_port,
-            "open_ports": sorted(open_ports),
-            "port_details": sorted(port_details, key=lambda x: x["port"]),
-            "total_ports_scanned": len(scan_order),
-            "open_ports_count": len(open_ports),
-            "closed_ports_count": len(scan_order) - len(open_ports),
-            "risk_level": risk_level,
-            "scan_duration": round(scan_duration, 2),
-            "timestamp": scan_start_time.isoformat(),
-            "date": scan_start_time.strftime("%Y-%m-%d"),
-            "time": scan_start_time.strftime("%H:%M:%S"),
-            "status": "completed",
-            "traversal_stats": traversal_stats
-        }
+            "open_ports": host_open_ports,
+            "port_details": host_details,
+            "open_ports_count": len(host_open_ports),
+            "ports_scanned": host_scanned,
+            "closed_ports_count": max(0, host_scanned - len(host_open_ports) - host_filtered),
+            "filtered_ports_count": host_filtered,
+            "cache_hits": cache_hits[target_ip],
+            "risk_level": assess_risk_level(host_open_ports),
+            "timing": timings[target_ip].snapshot()
+        })
 
-        # Save to history
-        user_id = "default_user"
+    # Bentuk hasil mengikuti request, bukan jumlah host yang lolos discovery
+    multi_target = len(config["targets"]) > 1
+    if multi_target:
+        open_ports = sorted({port for host in host_results for port in host["open_ports"]})
+        port_details = [dict(detail, host=host["resolved_ip"])
+                        for host in host_results for detail in host["port_details"]]
+        risk_level = max((host["risk_level"] for host in host_results), key=RISK_ORDER.get, default="Safe")
+    else:
+        open_ports = host_results[0]["open_ports"]
+        port_details = host_results[0]["port_details"]
+        risk_level = host_results[0]["risk_level"]
+
+    # Histogram per host digabung untuk scan ini, lalu ke metrik proses
+    connect_latency = HistogramData(LATENCY_BUCKETS)
+    banner_read = HistogramData(BANNER_BUCKETS)
+    for timing in timings.values():
+        connect_latency.merge(timing.connect_latency.state())
+        banner_read.merge(timing.banner_read.state())
+    PROBE_LATENCY.merge(connect_latency.state(), mode=mode)
+    BANNER_READ.merge(banner_read.state(), mode=mode)
+
+    open_ports_count = sum(host["open_ports_count"] for host in host_results)
+    total_ports_scanned = sum(host["ports_scanned"] for host in host_results)
+    filtered_ports_count = sum(host["filtered_ports_count"] for host in host_results)
+
+    # Calculate traversal statistics
+    traversal_stats = {
+        "total_ports_scanned": total_ports_scanned,
+        "success_rate": round((open_ports_count / total_ports_scanned) * 100, 2) if total_ports_scanned else 0,
+        "method_used": traversal,
+        "scan_order_preview": scan_order_preview,
+        "promoted_ports": sum(t.promoted_count for t in traversals.values()),
+        "time_budget": time_budget,
+        "budget_exhausted": total_ports_scanned < ports_per_host * len(host_results)
+    }
+
+    phases.add("finalize", time.perf_counter() - finalize_started)
+    phase_timings = phases.snapshot()
+    for name, seconds in phase_timings.items():
+        if name != "total":
+            SCAN_PHASE_SECONDS.inc(seconds, phase=name)
+    pacing_stats = pacing.snapshot()
+    PROBES_TOTAL.inc(pacing_stats["probes_sent"], mode=mode)
+    SCAN_DURATION.observe(scan_duration, mode=mode)
+
+    scan_result = {
+        "scan_id": scan_id,
+        # scan_id yang benar-benar menjalankan sweep kalau request ini menumpang scan identik
+        "coalesced_with": None,
+        "target": target,
+        "resolved_ip": [host["resolved_ip"] for host in host_results] if multi_target else host_results[0]["resolved_ip"],
+        "mode": mode,
+        "engine": engine,
+        "traversal": traversal,
+        "threads": threads,
+        "concurrency": concurrency if mode in ("async", "sharded") else None,
+        "concurrency_control": controller.snapshot() if engine not in ("udp", "raw-syn") else None,
+        "pipeline": pipeline.snapshot() if fingerprint_enabled and engine != "udp" else None,
+        "processes": processes if mode == "sharded" else None,
+        "rate": config["rate"],
+        "pacing": pacing_stats,
+        "fingerprint_enabled": fingerprint_enabled,
+        "port_range": f"{start_port}-{end_port}",
+        "start_port": start_port,
+        "end_port": end_port,
+        "open_ports": open_ports,
+        "port_details": port_details,
+        "total_ports_scanned": total_ports_scanned,
+        "open_ports_count": open_ports_count,
+        "closed_ports_count": max(0, total_ports_scanned - open_ports_count - filtered_ports_count),
+        "filtered_ports_count": filtered_ports_count,
+        "risk_level": risk_level,
+        "scan_duration": round(scan_duration, 2),
+        "phase_timings": phase_timings,
+        "latency_histograms": {
+            "connect": connect_latency.snapshot(),
+            "banner_read": banner_read.snapshot()
+        },
+        "timestamp": scan_start_time.isoformat(),
+        "date": scan_start_time.strftime("%Y-%m-%d"),
+        "time": scan_start_time.strftime("%H:%M:%S"),
+        "status": "completed",
+        "traversal_stats": traversal_stats,
+        "hosts": host_results,
+        "hosts_count": len(host_results),
+        "unresolved_targets": config["unresolved"],
+        # Host tanpa route (mis. broadcast), semua port-nya tercatat filtered
+        "unreachable_targets": sorted(unreachable),
+        "skipped_hosts": skipped_hosts,
+        "timing": None if multi_target else host_results[0]["timing"],
+        "resumed_ports": sum(resumed_done.values()),
+        "cache": {
+            "max_age": max_age,
+            "hits": sum(cache_hits.values()),
+            "probed": sum(dispatched.values())
+        },
+        "diff": diff_against_baseline(baseline, details_by_host, checkpoint) if baseline else None
+    }
+
+    save_scan_result(scan_result)
+    checkpoint.remove()
+    return scan_result
+
+def save_scan_result(scan_result):
+    """Append a finished scan to history and update the global stats"""
+    user_id = "default_user"
+    with history_lock:
         if user_id not in scan_histories:
             scan_histories[user_id] = []
         
@@ -578,18 +1027,152 @@ def scan():
         
         # Update global stats
         scan_stats["total_scans"] += 1
-        scan_stats["total_open_ports"] += len(open_ports)
-        scan_stats["last_scan"] = scan_start_time.isoformat()
+        scan_stats["total_open_ports"] += scan_result["open_ports_count"]
+        scan_stats["last_scan"] = scan_result["timestamp"]
         
         # Count threats (high risk ports)
-        if risk_level in ["High", "Medium"]:
+        if scan_result["risk_level"] in ["High", "Medium"]:
             scan_stats["total_threats"] += 1
 
-        return jsonify(scan_result)
+# --- Enhanced Routes ---
+@scanner_bp.route("/scan", methods=["POST"])
+def scan():
+    """Queue a scan job and return its scan_id immediately"""
+    try:
+        data = request.json
+        config, error = parse_scan_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        # Generate unique scan ID
+        scan_id = str(uuid.uuid4())[:8]
+        try:
+            job = submit_scan_job(scan_id, lambda progress: execute_scan(config, scan_id, progress),
+                                  count_scan_ports(config), coalesce_key=coalesce_key(config),
+                                  share=lambda scan_result: share_scan_result(scan_result, scan_id, config))
+        except JobQueueFull as e:
+            return jsonify({"error": str(e)}), 503
+
+        return jsonify(dict(job.to_dict(),
+                            status_url=f"/scan/{scan_id}/status",
+                            result_url=f"/scan/{scan_id}/result")), 202
     
     except Exception as e:
         return jsonify({"error": f"Scan failed: {str(e)}"}), 500
 
+def _stream_frame(event, payload, sse):
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps(dict(payload, type=event)) + "\n"
+
+@scanner_bp.route("/scan/stream", methods=["POST"])
+def scan_stream():
+    """Run a scan and stream open ports, progress and the final summary as NDJSON or SSE"""
+    try:
+        data = request.json
+        config, error = parse_scan_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        sse = (request.args.get("format") == "sse" or
+               "text/event-stream" in request.headers.get("Accept", ""))
+
+        scan_id = str(uuid.uuid4())[:8]
+        try:
+            job = submit_scan_job(scan_id, lambda progress: execute_scan(config, scan_id, progress),
+                                  count_scan_ports(config), stream=True, coalesce_key=coalesce_key(config),
+                                  share=lambda scan_result: share_scan_result(scan_result, scan_id, config))
+        except JobQueueFull as e:
+            return jsonify({"error": str(e)}), 503
+
+        def generate():
+            yield _stream_frame("queued", job.to_dict(), sse)
+            last_progress = time.monotonic()
+            while True:
+                try:
+                    event = job.events.get(timeout=STREAM_PROGRESS_INTERVAL)
+                except queue.Empty:
+                    event = False
+                if event is None:
+                    break
+                if event:
+                    _, ip, port_info = event
+                    yield _stream_frame("port", dict(port_info, host=ip), sse)
+                if time.monotonic() - last_progress >= STREAM_PROGRESS_INTERVAL:
+                    last_progress = time.monotonic()
+                    yield _stream_frame("progress", dict(job.progress.snapshot(), scan_id=scan_id), sse)
+
+            # Frame terakhir sama persis dengan scan_result dari /scan/<scan_id>/result
+            if job.status == "completed":
+                yield _stream_frame("summary", job.result, sse)
+            else:
+                yield _stream_frame("error", {"scan_id": scan_id, "error": f"Scan failed: {job.error}"}, sse)
+
+        mimetype = "text/event-stream" if sse else "application/x-ndjson"
+        return Response(stream_with_context(generate()), mimetype=mimetype,
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    except Exception as e:
+        return jsonify({"error": f"Scan failed: {str(e)}"}), 500
+
+def _interrupted_scan(scan_id, status_code):
+    """Response for a scan whose job is gone (e.g. after a restart) but whose checkpoint is left"""
+    if not checkpoint_exists(scan_id):
+        return jsonify({"error": "Scan not found"}), 404
+    return jsonify({
+        "scan_id": scan_id,
+        "status": "interrupted",
+        "resume_url": f"/scan/{scan_id}/resume"
+    }), status_code
+
+@scanner_bp.route("/scan/<scan_id>/status", methods=["GET"])
+@limiter.exempt
+def scan_status(scan_id):
+    """Status and progress of a queued or running scan job"""
+    job = get_scan_job(scan_id)
+    if not job:
+        return _interrupted_scan(scan_id, 200)
+    return jsonify(job.to_dict())
+
+@scanner_bp.route("/scan/<scan_id>/resume", methods=["POST"])
+def resume_scan(scan_id):
+    """Continue a failed or interrupted scan from its last checkpoint"""
+    try:
+        checkpoint = ScanCheckpoint.load(scan_id)
+        if not checkpoint:
+            return jsonify({"error": "No checkpoint found for this scan"}), 404
+
+        config = checkpoint.config
+        try:
+            job = submit_scan_job(scan_id,
+                                  lambda progress: execute_scan(config, scan_id, progress, checkpoint),
+                                  count_scan_ports(config) - checkpoint.ports_done)
+        except JobAlreadyRunning as e:
+            return jsonify({"error": str(e)}), 409
+        except JobQueueFull as e:
+            return jsonify({"error": str(e)}), 503
+
+        return jsonify(dict(job.to_dict(),
+                            resumed_ports=checkpoint.ports_done,
+                            status_url=f"/scan/{scan_id}/status",
+                            result_url=f"/scan/{scan_id}/result")), 202
+
+    except Exception as e:
+        return jsonify({"error": f"Resume failed: {str(e)}"}), 500
+
+@scanner_bp.route("/scan/<scan_id>/result", methods=["GET"])
+@limiter.exempt
+def scan_job_result(scan_id):
+    """Final scan_result once the job has finished"""
+    job = get_scan_job(scan_id)
+    if not job:
+        return _interrupted_scan(scan_id, 409)
+    if job.status == "failed":
+        return jsonify(dict(job.to_dict(), error=f"Scan failed: {job.error}")), 500
+    if job.status != "completed":
+        return jsonify(job.to_dict()), 202
+    return jsonify(job.result)
+
 @scanner_bp.route("/history", methods=["GET"])
 def get_history():
     """Get scan history with pagination and filtering"""
@@ -600,7 +1183,9 @@ def get_history():
         filter_by = request.args.get('filter', 'all')
         sort_by = request.args.get('sort', 'date_desc')
         
-        history = scan_histories.get(user_id, [])
+        # Salinan supaya job yang selesai di tengah request tidak mengubah list yang sedang dibaca
+        with history_lock:
+            history = list(scan_histories.get(user_id, []))
         
         # Apply filters
         if filter_by != 'all':
@@ -617,8 +1202,7 @@ def get_history():
         elif sort_by == 'date_asc':
             history = sorted(history, key=lambda x: x['timestamp'])
         elif sort_by == 'risk_desc':
-            risk_order = {'High': 3, 'Medium': 2, 'Low': 1, 'Safe': 0}
-            history = sorted(history, key=lambda x: risk_order.get(x['risk_level'], 0), reverse=True)
+            history = sorted(history, key=lambda x: RISK_ORDER.get(x['risk_level'], 0), reverse=True)
         
         # Pagination
         total_items = len(history)
@@ -704,10 +1288,7 @@ def get_history():
 def get_scan_detail(scan_id):
     """Get detailed information for a specific scan"""
     try:
-        user_id = "default_user"
-        history = scan_histories.get(user_id, [])
-        
-        scan = next((scan for scan in history if scan['scan_id'] == scan_id), None)
+        scan = find_scan_result(scan_id)
         if not scan:
             return jsonify({"error": "Scan not found"}), 404
         
@@ -721,12 +1302,14 @@ def delete_scan(scan_id):
     """Delete a specific scan from history"""
     try:
         user_id = "default_user"
-        history = scan_histories.get(user_id, [])
-        
-        # Find and remove scan
-        scan_histories[user_id] = [scan for scan in history if scan['scan_id'] != scan_id]
+        with history_lock:
+            history = scan_histories.get(user_id, [])
+            
+            # Find and remove scan
+            scan_histories[user_id] = [scan for scan in history if scan['scan_id'] != scan_id]
+            deleted = len(scan_histories[user_id]) != len(history)
         
-        if len(scan_histories[user_id]) == len(history):
+        if not deleted:
             return jsonify({"error": "Scan not found"}), 404
         
         return jsonify({"message": "Scan deleted successfully"})
@@ -739,7 +1322,8 @@ def clear_history():
     """Clear all scan history"""
     try:
         user_id = "default_user"
-        scan_histories[user_id] = []
+        with history_lock:
+            scan_histories[user_id] = []
         
         return jsonify({"message": "History cleared successfully"})
     
@@ -751,7 +1335,8 @@ def get_stats():
     """Get dashboard statistics"""
     try:
         user_id = "default_user"
-        history = scan_histories.get(user_id, [])
+        with history_lock:
+            history = list(scan_histories.get(user_id, []))
         
         # Calculate real-time stats
         today_scans = len([scan for scan in history if scan['date'] == datetime.now().strftime("%Y-%m-%d")])
@@ -775,7 +1360,8 @@ def get_stats():
             "total_scans": total_scans,
             "threats_found": total_threats,
             "security_score": security_score,
-            "last_scan": last_scan
+            "last_scan": last_scan,
+            "result_cache": RESULT_CACHE.stats()
         }
         
         return jsonify(stats)
@@ -788,7 +1374,8 @@ def export_pdf():
     try:
         data = request.json
         scan_id = data.get("scan_id", f"scan_{len(scan_histories.get('default_user', []))}")
-        return generate_pdf(scan_id, data)
+        with PDF_RENDER.time():
+            return generate_pdf(scan_id, data)
     except Exception as e:
         return jsonify({"error": f"PDF export failed: {str(e)}"}), 500
 
@@ -797,10 +1384,12 @@ def test():
     return jsonify({
         "status": "Scanner blueprint is working!", 
         "routes": [
-            "scan", "history", "history/<scan_id>", 
+            "scan", "scan/stream", "scan/<scan_id>/status", "scan/<scan_id>/result",
+            "history", "history/<scan_id>", 
             "history/clear", "stats", "export/pdf"
         ],
-        "available_traversal_methods": ["bfs", "dfs", "adaptive"]
+        "available_traversal_methods": ["bfs", "dfs", "adaptive"],
+        "available_modes": ["tcp", "syn", "async", "sharded", "udp"]
     })
 
 @scanner_bp.route("/validate", methods=["POST"])
@@ -814,7 +1403,8 @@ def validate_target():
             return jsonify({"valid": False, "error": "Target is required"}), 400
         
         # Try to resolve target
-        ip = resolve_target(target)
+        addresses = RESOLVER.resolve(target)
+        ip = addresses["ipv4"][0] if addresses and addresses["ipv4"] else None
         if not ip:
             return jsonify({"valid": False, "error": "Cannot resolve target"}), 400
         
@@ -822,6 +1412,7 @@ def validate_target():
             "valid": True,
             "target": target,
             "resolved_ip": ip,
+            "addresses": addresses,
             "message": f"Target resolved to {ip}" if target != ip else "Target is valid"
         })
     
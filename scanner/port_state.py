@@ -0,0 +1,110 @@
+UNPROBED = 0
+CLOSED = 1
+FILTERED = 2
+OPEN = 3
+
+STATE_NAMES = {CLOSED: "closed", FILTERED: "filtered", OPEN: "open"}
+
+# Satu byte menyimpan empat port, tabel ini membongkar satu byte sekaligus
+_DECODED = [tuple((byte >> shift) & 3 for shift in (0, 2, 4, 6)) for byte in range(256)]
+_CLEAR_MASKS = (0xfc, 0xf3, 0xcf, 0x3f)
+
+
+class PortStateMap:
+    """Two bits of state (unprobed/closed/filtered/open) per port: 16 KiB covers every TCP port
+
+    Grows to cover any port it is given. Not locked, the owner (checkpoint, cache,
+    raw scanner) serialises access.
+    """
+
+    def __init__(self, start_port, end_port=None, data=None):
+        # Basis dibulatkan ke kelipatan 4 supaya memperluas ke bawah cukup menyisipkan byte
+        self.base = start_port & ~3
+        end_port = start_port if end_port is None else end_port
+        # Range terbalik = map kosong, tumbuh sendiri begitu ada port yang di-set
+        size = max(0, (end_port - self.base) // 4 + 1)
+        self.data = bytearray(data) if data is not None else bytearray(size)
+
+    def _grow(self, port):
+        if port < self.base:
+            base = port & ~3
+            self.data[0:0] = bytes((self.base - base) // 4)
+            self.base = base
+        elif (port - self.base) // 4 >= len(self.data):
+            self.data.extend(bytes((port - self.base) // 4 + 1 - len(self.data)))
+
+    def get(self, port):
+        index = port - self.base
+        if index < 0 or index >> 2 >= len(self.data):
+            return UNPROBED
+        return (self.data[index >> 2] >> ((index & 3) * 2)) & 3
+
+    def set(self, port, state):
+        """Store state for port and return the previous one"""
+        if port < self.base or (port - self.base) >> 2 >= len(self.data):
+            self._grow(port)
+        index = port - self.base
+        shift = (index & 3) * 2
+        byte = self.data[index >> 2]
+        self.data[index >> 2] = (byte & _CLEAR_MASKS[index & 3]) | (state << shift)
+        return (byte >> shift) & 3
+
+    def ports(self, state=None, start_port=None, end_port=None):
+        """Yield (port, state) for probed ports in order, optionally only one state or a range"""
+        first = 0 if start_port is None else max(0, (start_port - self.base) >> 2)
+        last = len(self.data) if end_port is None else min(len(self.data), ((end_port - self.base) >> 2) + 1)
+        # Salinan supaya thread lain boleh menulis selama iterasi
+        data = bytes(self.data[first:last])
+        for offset, byte in enumerate(data):
+            if not byte:
+                continue
+            port = self.base + (first + offset) * 4
+            for slot, value in enumerate(_DECODED[byte]):
+                if value and (state is None or value == state):
+                    if start_port is not None and port + slot < start_port:
+                        continue
+                    if end_port is not None and port + slot > end_port:
+                        continue
+                    yield port + slot, value
+
+    def _bits(self):
+        """(low bits, high bits) of every 2-bit slot as two big ints"""
+        value = int.from_bytes(self.data, 'little')
+        mask = int.from_bytes(b'\x55' * len(self.data), 'little')
+        return value & mask, (value >> 1) & mask
+
+    def counts(self):
+        """{"closed": n, "filtered": n, "open": n}"""
+        low, high = self._bits()
+        return {
+            "closed": (low & ~high).bit_count(),
+            "filtered": (high & ~low).bit_count(),
+            "open": (low & high).bit_count()
+        }
+
+    def probed_count(self):
+        low, high = self._bits()
+        return (low | high).bit_count()
+
+    def forget(self, other):
+        """Reset every port other has a state for back to unprobed"""
+        low, high = other._bits()
+        probed = low | high
+        probed |= probed << 1
+        # Geser mask other ke posisi bit map ini (basis keduanya kelipatan 4 port = 1 byte)
+        shift = (other.base - self.base) * 2
+        probed = probed << shift if shift >= 0 else probed >> -shift
+        value = int.from_bytes(self.data, 'little') & ~probed
+        self.data = bytearray(value.to_bytes(len(self.data), 'little'))
+
+    def copy(self):
+        return PortStateMap(self.base, data=self.data)
+
+    def state(self):
+        """(base, bytes) to pickle into a shard, a checkpoint or the result cache"""
+        return self.base, bytes(self.data)
+
+    @classmethod
+    def from_state(cls, state):
+        base, data = state
+        return cls(base, data=data)
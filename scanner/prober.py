@@ -0,0 +1,122 @@
+import errno
+import threading
+import time
+
+from .port_state import PortStateMap, UNPROBED, FILTERED
+
+# Pembukuan probe bersama SynScanner dan UdpScanner: terkirim, dijawab, atau menyerah
+RECV_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Buffer kernel penuh: tunggu sebentar lalu kirim ulang, paling banyak SEND_RETRY_LIMIT kali
+TRANSIENT_SEND_ERRNOS = frozenset((errno.ENOBUFS, errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR))
+SEND_RETRY_LIMIT = 100
+# Error kirim yang berarti host tidak bisa dijangkau sama sekali (tanpa route, broadcast, ...)
+UNREACHABLE_ERRNOS = frozenset((errno.ENETUNREACH, errno.EHOSTUNREACH, errno.EACCES, errno.EADDRNOTAVAIL))
+
+
+class Prober:
+    """Sent/answered bookkeeping for stateless probers that match replies on a receiver thread
+
+    states[ip] holds FILTERED for every probe sent and not yet answered; awaiting counts
+    the ones still worth waiting for. Subclasses send, receive and call _answered().
+    """
+
+    # sendto melaporkan error tertunda milik paket sebelumnya (socket UDP dengan IP_RECVERR)
+    deferred_send_errors = False
+
+    def __init__(self, timeout, retries, pacing=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.pacing = pacing
+        # ip -> PortStateMap; FILTERED = terkirim dan belum dijawab
+        self.states = {}
+        self.awaiting = 0
+        # Host tanpa route dan probe yang gagal dikirim: tetap filtered, tidak dikirim ulang
+        self.unreachable = set()
+        self.send_failed = set()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def _register(self, probes):
+        """Mark probes as sent-and-unanswered just before they go out"""
+        for ip, port in probes:
+            with self.lock:
+                states = self.states.get(ip)
+                if states is None:
+                    states = self.states[ip] = PortStateMap(port)
+                if states.set(port, FILTERED) == UNPROBED and ip not in self.unreachable:
+                    self.awaiting += 1
+            yield ip, port
+
+    def _awaited(self, ip, port):
+        """Whether a filtered probe still counts in awaiting, caller holds the lock"""
+        return ip not in self.unreachable and (ip, port) not in self.send_failed
+
+    def _answered(self, ip, port):
+        """Count the first answer to a probe that was still filtered, caller holds the lock"""
+        # Probe yang sudah menyerah tidak dihitung di awaiting lagi
+        if self._awaited(ip, port):
+            self.awaiting -= 1
+
+    def _unanswered(self):
+        with self.lock:
+            hosts = list(self.states.items())
+        for ip, states in hosts:
+            if ip in self.unreachable:
+                continue
+            for port, _ in states.ports(FILTERED):
+                if self._awaited(ip, port):
+                    yield ip, port
+
+    def _give_up(self, ip, port, host_down=False):
+        """A probe that can never be sent stays filtered and stops being awaited"""
+        with self.lock:
+            if ip in self.unreachable:
+                return
+            if host_down:
+                # Semua probe host ini yang masih ditunggu berhenti ditunggu sekaligus
+                self.awaiting -= sum(1 for pending, _ in self.states[ip].ports(FILTERED)
+                                     if self._awaited(ip, pending))
+                self.unreachable.add(ip)
+            else:
+                self.send_failed.add((ip, port))
+                self.awaiting -= 1
+
+    def _sendto(self, sock, data, address, ip, port):
+        """Send one probe, giving it up when the kernel keeps refusing it"""
+        last_errno = None
+        for _ in range(SEND_RETRY_LIMIT):
+            try:
+                sock.sendto(data, address)
+                return
+            except OSError as e:
+                if e.errno in TRANSIENT_SEND_ERRNOS:
+                    time.sleep(0.001)
+                    continue
+                # Error yang sama dua kali berturut-turut baru pasti milik paket ini
+                if e.errno == last_errno or not self.deferred_send_errors:
+                    self._give_up(ip, port, host_down=e.errno in UNREACHABLE_ERRNOS)
+                    return
+                last_errno = e.errno
+        self._give_up(ip, port)
+
+    def _slow_down(self):
+        """Called before every resend round"""
+
+    def _send_rounds(self, send, probes):
+        """First pass over probes, then resend the unanswered ones up to retries times"""
+        # Probe dibaca langsung dari iterator, tidak pernah disalin ke list
+        send(self._register(probes))
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._slow_down()
+                send(self._unanswered())
+            deadline = time.monotonic() + self.timeout
+            while time.monotonic() < deadline:
+                with self.lock:
+                    if not self.awaiting:
+                        break
+                time.sleep(0.01)
+            with self.lock:
+                if not self.awaiting:
+                    break
@@ -0,0 +1,166 @@
+import re
+import struct
+
+from .services import COMMON_SERVICES, FTP_PORTS, SMTP_PORTS, HTTP_PROBES, HTTP_PROBE_PORTS, FINGERPRINT_MATCHER
+
+# Paling banyak sekian probe per port, masing-masing bisa menunggu satu banner timeout
+MAX_PROBES_PER_PORT = 3
+
+TLS_VERSIONS = {b'\x00': 'SSL 3.0', b'\x01': 'TLS 1.0', b'\x02': 'TLS 1.1', b'\x03': 'TLS 1.2'}
+
+
+def _tls_client_hello():
+    """Static TLS 1.2 ClientHello that any TLS 1.0-1.3 server answers with a ServerHello or an alert"""
+    ciphers = (0xc02f, 0xc030, 0xc02b, 0xc02c, 0xcca8, 0xcca9, 0xc013, 0xc014,
+               0x009c, 0x009d, 0x002f, 0x0035, 0x000a, 0x1301, 0x1302, 0x1303)
+    groups = (0x001d, 0x0017, 0x0018)
+    signatures = (0x0403, 0x0503, 0x0603, 0x0804, 0x0805, 0x0806, 0x0401, 0x0501, 0x0601, 0x0201)
+    extensions = (
+        struct.pack('!HHH', 0x000a, 2 + 2 * len(groups), 2 * len(groups)) + struct.pack(f'!{len(groups)}H', *groups)
+        + struct.pack('!HHB', 0x000b, 2, 1) + b'\x00'
+        + struct.pack('!HHH', 0x000d, 2 + 2 * len(signatures), 2 * len(signatures))
+        + struct.pack(f'!{len(signatures)}H', *signatures)
+    )
+    body = (b'\x03\x03' + bytes(range(32)) + b'\x00'
+            + struct.pack('!H', 2 * len(ciphers)) + struct.pack(f'!{len(ciphers)}H', *ciphers)
+            + b'\x01\x00' + struct.pack('!H', len(extensions)) + extensions)
+    handshake = b'\x01' + struct.pack('!I', len(body))[1:] + body
+    return b'\x16\x03\x01' + struct.pack('!H', len(handshake)) + handshake
+
+
+def _mongodb_is_master():
+    """Legacy OP_QUERY isMaster on admin.$cmd, still answered by every MongoDB version"""
+    document = b'\x10isMaster\x00' + struct.pack('<i', 1) + b'\x00'
+    document = struct.pack('<i', len(document) + 4) + document
+    query = struct.pack('<i', 0) + b'admin.$cmd\x00' + struct.pack('<ii', 0, -1) + document
+    return struct.pack('<iiii', len(query) + 16, 0x53454e41, 0, 2004) + query
+
+
+def _tls_service(match, port):
+    # Port TLS yang dikenal (HTTPS, IMAPS, ...) tetap memakai nama service-nya
+    service = COMMON_SERVICES.get(port)
+    return service if service in TLS_SERVICES else 'SSL/TLS'
+
+
+def _tls_info(match, port):
+    return f"{TLS_VERSIONS.get(match.group(1), 'TLS')} ServerHello"
+
+
+TLS_PORTS = (443, 465, 636, 853, 989, 990, 992, 993, 994, 995, 2376, 5986, 8443, 9443)
+TLS_SERVICES = frozenset(('HTTPS', 'HTTPS-Alt', 'IMAPS', 'POP3S', 'LDAPS', 'Docker TLS'))
+
+# Service yang biasanya menjawab HTTP walau nomor port-nya bukan port web
+HTTP_SERVICES = frozenset((
+    'HTTP', 'HTTP-Alt', 'Elasticsearch', 'Kibana', 'CouchDB', 'Grafana', 'Prometheus', 'SonarQube',
+    'Nexus', 'RabbitMQ Management', 'InfluxDB', 'Docker', 'Hadoop NameNode', 'Hadoop DataNode',
+    'Hadoop Resource Manager', 'Hadoop History Server', 'Hadoop NodeManager', 'Hadoop Timeline Service',
+    'Spark UI', 'Spark History'
+))
+
+# Service yang menyapa duluan: cukup menunggu, tanpa mengirim apa pun
+SERVER_FIRST_PORTS = FTP_PORTS + SMTP_PORTS + (22, 23, 110, 143, 3306, 5900, 6666, 6667)
+
+# Service probe database ala nmap-service-probes, urut dari yang paling mungkin:
+# (name, payload, ports, services, [(pattern, service, info)])
+# payload None = hanya menunggu greeting (NULL probe), {host} diganti IP target.
+# Probe dipilih kalau port-nya ada di ports atau COMMON_SERVICES[port] ada di services.
+# service/info boleh callable(match, port); info None = banner apa adanya.
+# Respons yang tidak cocok di sini masih dicocokkan ke SERVICE_FINGERPRINTS.
+SERVICE_PROBES = [
+    ('NULL', None, SERVER_FIRST_PORTS, (), [
+        (rb'^...\x00\x0a([0-9][\x20-\x7e]*MariaDB[\x20-\x7e]*)\x00', 'MariaDB Server', 'MariaDB {0}'),
+        (rb'^...\x00\x0a([0-9][\x20-\x7e]{0,40}?)\x00', 'MySQL Server', 'MySQL {0}'),
+        (rb'^...\x00\xff..(?:#.{5})?([\x20-\x7e]+)', 'MySQL Server', '{0}'),
+        (rb'^RFB \d{3}\.\d{3}\n', 'VNC', None),
+    ]),
+    ('TLSSessionReq', _tls_client_hello(), TLS_PORTS, TLS_SERVICES, [
+        (rb'^\x16\x03[\x00-\x04]..\x02...\x03([\x00-\x03])', _tls_service, _tls_info),
+        (rb'^\x15\x03[\x00-\x04]\x00\x02', _tls_service, 'TLS alert'),
+    ]),
+    ('RedisPing', b'*1\r\n$4\r\nPING\r\n', (6379,), ('Redis',), [
+        (rb'^\+PONG\r\n', 'Redis', None),
+        (rb'^-(?:NOAUTH|DENIED|ERR operation not permitted)', 'Redis', None),
+    ]),
+    ('PostgresSSLRequest', b'\x00\x00\x00\x08\x04\xd2\x16\x2f', (5432,), ('PostgreSQL',), [
+        (rb'^S\Z', 'PostgreSQL', 'PostgreSQL (SSL supported)'),
+        (rb'^N\Z', 'PostgreSQL', 'PostgreSQL (SSL not supported)'),
+    ]),
+    ('MongoDBIsMaster', _mongodb_is_master(), (27017, 27018, 27019), ('MongoDB',), [
+        (rb'^.{12}\x01\x00\x00\x00', 'MongoDB Server', 'MongoDB OP_REPLY'),
+    ]),
+    ('RDPConnectionRequest', b'\x03\x00\x00\x13\x0e\xe0\x00\x00\x00\x00\x00\x01\x00\x08\x00\x03\x00\x00\x00',
+     (3389,), ('RDP',), [
+        (rb'^\x03\x00\x00[\x0b-\x13]\x0e\xd0', 'Remote Desktop Protocol', 'RDP X.224 Connection Confirm'),
+    ]),
+    ('MemcachedVersion', b'version\r\n', (11211,), ('Memcached',), [
+        (rb'^VERSION \d', 'Memcached', None),
+    ]),
+    ('GetRequest', HTTP_PROBES[0], tuple(HTTP_PROBE_PORTS), HTTP_SERVICES, []),
+    ('HTTPOptions', HTTP_PROBES[2], tuple(HTTP_PROBE_PORTS), HTTP_SERVICES, []),
+]
+
+# Dicoba di port yang tidak punya probe sendiri, setelah NULL probe
+FALLBACK_PROBES = ('GetRequest',)
+
+
+class ProbeDatabase:
+    """Service probes indexed by port and by COMMON_SERVICES name"""
+
+    def __init__(self, probes):
+        self.probes = []
+        self.by_name = {}
+        self.by_port = {}
+        self.by_service = {}
+        for order, (name, payload, ports, services, matches) in enumerate(probes):
+            compiled = tuple((re.compile(pattern, re.DOTALL), service, info) for pattern, service, info in matches)
+            probe = (name, payload, compiled, order)
+            self.probes.append(probe)
+            self.by_name[name] = probe
+            for port in ports:
+                self.by_port.setdefault(port, []).append(probe)
+            for service in services:
+                self.by_service.setdefault(service, []).append(probe)
+        self.null_probe = self.by_name['NULL']
+
+    def plan(self, port):
+        """Probes for port, most probable first: the port's own probes, then the fallbacks"""
+        candidates = self.by_port.get(port, []) + self.by_service.get(COMMON_SERVICES.get(port), [])
+        # Port tanpa probe sendiri: dengarkan dulu, lalu coba HTTP
+        plan = sorted(set(candidates), key=lambda probe: probe[3]) or [self.null_probe]
+        for name in FALLBACK_PROBES:
+            if self.by_name[name] not in plan:
+                plan.append(self.by_name[name])
+        return plan[:MAX_PROBES_PER_PORT]
+
+    def match(self, probe, response, port):
+        """(service, info) when response identifies the service confidently, else None"""
+        for pattern, service, info in probe[2]:
+            found = pattern.search(response)
+            if found is None:
+                continue
+            if callable(service):
+                service = service(found, port)
+            if callable(info):
+                info = info(found, port)
+            elif info is not None:
+                info = info.format(*(group.decode('utf-8', errors='ignore') for group in found.groups()))
+            return service, info
+        service = FINGERPRINT_MATCHER.match(response, port)
+        if not service:
+            return None
+        # 'HTTP' saja kurang dari nama aplikasi web yang biasa di port itu (Elasticsearch, Grafana, ...)
+        common = COMMON_SERVICES.get(port)
+        if service == 'HTTP' and common in HTTP_SERVICES and not common.startswith('HTTP'):
+            service = common
+        return service, None
+
+
+PROBE_DB = ProbeDatabase(SERVICE_PROBES)
+
+
+def probe_payload(probe, target_ip):
+    """Bytes to send for probe, None for the NULL probe"""
+    payload = probe[1]
+    if payload is None:
+        return None
+    return payload.replace(b'{host}', target_ip.encode())
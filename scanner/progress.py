@@ -0,0 +1,42 @@
+import threading
+
+
+class ScanProgress:
+    """Thread-safe counters a running scan reports into"""
+
+    def __init__(self, ports_total=0):
+        self.ports_total = ports_total
+        self.ports_done = 0
+        self.open_so_far = 0
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """callback(ip, port_info) is called for every open port as it is found"""
+        self.listeners.append(callback)
+
+    def probe_done(self, ip, port_info=None, counted=True):
+        """Record a finished probe; counted=False for retries and late results"""
+        with self.lock:
+            if counted:
+                self.ports_done += 1
+            if port_info:
+                self.open_so_far += 1
+        if port_info:
+            for callback in self.listeners:
+                callback(ip, port_info)
+
+    def skip(self, count):
+        """Drop probes that will never be sent (e.g. hosts found down) from the total"""
+        with self.lock:
+            self.ports_total = max(0, self.ports_total - count)
+
+    def snapshot(self):
+        with self.lock:
+            percent = (self.ports_done / self.ports_total * 100) if self.ports_total else 0
+            return {
+                "ports_done": self.ports_done,
+                "ports_total": self.ports_total,
+                "open_so_far": self.open_so_far,
+                "percent": round(min(percent, 100), 2)
+            }
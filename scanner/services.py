@@ -0,0 +1,219 @@
+from .matcher import FingerprintMatcher
+
+FTP_PORTS = (20, 21, 990, 2121)
+SMTP_PORTS = (25, 465, 587, 2525)
+
+# Service fingerprinting database: (pattern, service, ports)
+# ports None berarti berlaku di semua port. Pola yang lebih panjang (lebih spesifik)
+# menang, lalu entri yang port-nya cocok mengalahkan entri umum
+SERVICE_FINGERPRINTS = [
+    # HTTP services
+    (b'HTTP/1.', 'HTTP', None),
+    (b'Server: Apache', 'Apache HTTP Server', None),
+    (b'Server: nginx', 'Nginx HTTP Server', None),
+    (b'Server: Microsoft-IIS', 'Microsoft IIS', None),
+    (b'Server: lighttpd', 'Lighttpd HTTP Server', None),
+    
+    # SSH
+    (b'SSH-2.0', 'SSH-2.0', None),
+    (b'SSH-1.99', 'SSH-1.99', None),
+    
+    # FTP
+    (b'220 ', 'FTP', FTP_PORTS),
+    (b'220-FileZilla', 'FileZilla FTP Server', None),
+    (b'220 Microsoft FTP', 'Microsoft FTP Server', None),
+    (b'220-ProFTPD', 'ProFTPD Server', None),
+    (b'220 ProFTPD', 'ProFTPD Server', None),
+    
+    # SMTP
+    (b'220 ', 'SMTP', SMTP_PORTS),
+    (b'220-Welcome', 'SMTP Server', None),
+    (b'ESMTP', 'SMTP Server', None),
+    
+    # 220 greeting on a port that is neither FTP nor SMTP
+    (b'220 ', 'FTP/SMTP', None),
+    
+    # POP3
+    (b'+OK', 'POP3', (110, 995)),
+    (b'+OK', 'POP3 (if port 110/995)', None),
+    
+    # IMAP
+    (b'* OK', 'IMAP', (143, 993)),
+    (b'* OK', 'IMAP (if port 143/993)', None),
+    
+    # Telnet
+    (b'Telnet', 'Telnet', None),
+    
+    # DNS
+    (b'DNS', 'DNS Server', None),
+    
+    # MySQL
+    (b'mysql_native_password', 'MySQL Server', None),
+    
+    # PostgreSQL
+    (b'FATAL', 'PostgreSQL', (5432,)),
+    (b'FATAL', 'PostgreSQL (if port 5432)', None),
+    
+    # Redis
+    (b'-ERR', 'Redis', (6379,)),
+    (b'-ERR', 'Redis (if port 6379)', None),
+    
+    # MongoDB
+    (b'MongoDB', 'MongoDB Server', None),
+    
+    # RDP
+    (b'RDP', 'Remote Desktop Protocol', None),
+    
+    # SNMP
+    (b'SNMP', 'SNMP', None),
+    
+    # LDAP
+    (b'LDAP', 'LDAP Server', None),
+]
+
+# Dikompilasi sekali saat import, bukan per panggilan identify_service
+FINGERPRINT_MATCHER = FingerprintMatcher(SERVICE_FINGERPRINTS)
+
+# Common service ports
+COMMON_SERVICES = {
+    21: 'FTP',
+    22: 'SSH',
+    23: 'Telnet',
+    25: 'SMTP',
+    53: 'DNS',
+    80: 'HTTP',
+    110: 'POP3',
+    143: 'IMAP',
+    443: 'HTTPS',
+    993: 'IMAPS',
+    995: 'POP3S',
+    3389: 'RDP',
+    5432: 'PostgreSQL',
+    3306: 'MySQL',
+    6379: 'Redis',
+    27017: 'MongoDB',
+    161: 'SNMP',
+    389: 'LDAP',
+    636: 'LDAPS',
+    1433: 'MSSQL',
+    5984: 'CouchDB',
+    8080: 'HTTP-Alt',
+    8443: 'HTTPS-Alt',
+    9200: 'Elasticsearch',
+    5601: 'Kibana',
+    6666: 'IRC',
+    6667: 'IRC',
+    119: 'NNTP',
+    2049: 'NFS',
+    111: 'RPC',
+    135: 'RPC',
+    139: 'NetBIOS',
+    445: 'SMB',
+    1521: 'Oracle',
+    1526: 'Oracle',
+    2181: 'ZooKeeper',
+    9092: 'Kafka',
+    11211: 'Memcached',
+    2375: 'Docker',
+    2376: 'Docker TLS',
+    4369: 'Erlang',
+    5672: 'RabbitMQ',
+    15672: 'RabbitMQ Management',
+    9090: 'Prometheus',
+    3000: 'Grafana',
+    8086: 'InfluxDB',
+    9000: 'SonarQube',
+    8081: 'Nexus',
+    50070: 'Hadoop NameNode',
+    9999: 'Hadoop Secondary NameNode',
+    8088: 'Hadoop Resource Manager',
+    19888: 'Hadoop History Server',
+    2888: 'Zookeeper',
+    3888: 'Zookeeper',
+    7077: 'Spark Master',
+    4040: 'Spark UI',
+    18080: 'Spark History',
+    8020: 'Hadoop HDFS',
+    9083: 'Hive Metastore',
+    10000: 'Hive Server2',
+    10002: 'Hive WebHCat',
+    50075: 'Hadoop DataNode',
+    8042: 'Hadoop NodeManager',
+    8188: 'Hadoop Timeline Service',
+    19890: 'Hadoop MapReduce History',
+    8032: 'Hadoop ResourceManager',
+    8030: 'Hadoop ResourceManager Scheduler',
+    8031: 'Hadoop ResourceManager Tracker',
+    8033: 'Hadoop ResourceManager Admin',
+    10020: 'Hadoop MapReduce Job History',
+    13562: 'Hadoop Shuffle'
+}
+
+# HTTP probes for better detection
+HTTP_PROBES = [
+    b'GET / HTTP/1.1\r\nHost: {host}\r\n\r\n',
+    b'HEAD / HTTP/1.1\r\nHost: {host}\r\n\r\n',
+    b'OPTIONS / HTTP/1.1\r\nHost: {host}\r\n\r\n'
+]
+
+# Ports that get an HTTP probe when they stay silent
+HTTP_PROBE_PORTS = [80, 443, 8080, 8443, 8000, 3000, 9000]
+
+# Port range groups for intelligent traversal
+PORT_GROUPS = {
+    'critical': [21, 22, 23, 25, 53, 80, 110, 143, 443, 993, 995, 3389],
+    'database': [3306, 5432, 1433, 1521, 6379, 27017, 5984, 9200],
+    'web': [80, 443, 8080, 8443, 8000, 3000, 9000, 8081],
+    'messaging': [25, 587, 465, 110, 143, 993, 995, 5672, 15672],
+    'admin': [22, 23, 3389, 5985, 5986, 135, 139, 445],
+    'monitoring': [161, 9090, 3000, 5601, 8086, 9000],
+    'development': [8080, 8443, 3000, 4000, 5000, 8000, 9000, 8081]
+}
+
+def open_port_info(port):
+    """port_info for an open port before (or without) fingerprinting"""
+    return {
+        "port": port,
+        "status": "open",
+        "service": COMMON_SERVICES.get(port, 'Unknown'),
+        "banner": None
+    }
+
+def describe_banner(port_info, banner, matched=None):
+    """Fill service and banner text from a probe reply; matched is the probe's (service, info)"""
+    service, info = matched or (None, None)
+    port_info["service"] = service or identify_service(banner, port_info["port"])
+    port_info["banner"] = info or banner[:100].decode('utf-8', errors='ignore').strip()
+
+def identify_service(banner, port):
+    """Identify service based on banner and port"""
+    if not banner:
+        return COMMON_SERVICES.get(port, 'Unknown')
+    
+    banner_lower = banner.lower()
+    
+    # Check fingerprint database (single pass over the banner)
+    service = FINGERPRINT_MATCHER.match(banner, port)
+    if service:
+        return service
+    
+    # Special cases based on port and banner content
+    if port == 25 and b'220' in banner:
+        return 'SMTP'
+    elif port == 110 and b'+OK' in banner:
+        return 'POP3'
+    elif port == 143 and b'* OK' in banner:
+        return 'IMAP'
+    elif port in [80, 8080, 3000, 8000] and b'http' in banner_lower:
+        return 'HTTP'
+    elif port in [443, 8443] and (b'http' in banner_lower or b'ssl' in banner_lower):
+        return 'HTTPS'
+    elif port == 22 and b'ssh' in banner_lower:
+        return 'SSH'
+    elif port == 21 and b'ftp' in banner_lower:
+        return 'FTP'
+    elif port == 23 and (b'telnet' in banner_lower or b'login:' in banner_lower):
+        return 'Telnet'
+    
+    # Fallback to common services
+    return COMMON_SERVICES.get(port, 'Unknown')
@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from .async_engine import run_async_scan
+from .concurrency import ConcurrencyController
+from .pacing import ScanPacing
+from .pipeline import FingerprintPipeline
+from .targets import TargetScheduler
+from .timing import RttEstimator
+
+# Satu proses per core, masing-masing dengan event loop sendiri
+SHARD_DEFAULT_PROCESSES = os.cpu_count() or 1
+# Proses melebihi jumlah core hanya menambah biaya spawn
+SHARD_MAX_PROCESSES = min(32, SHARD_DEFAULT_PROCESSES)
+
+# Worker mengirim progress ke parent per batch, bukan per probe
+PROGRESS_BATCH = 256
+
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+class _ShardProgress:
+    """Batches probe counts from a worker process back to the parent's ScanProgress"""
+
+    def __init__(self):
+        self.pending = 0
+
+    def probe_done(self, ip, port_info=None, counted=True):
+        if counted:
+            self.pending += 1
+        if port_info or self.pending >= PROGRESS_BATCH:
+            self.flush(ip, port_info)
+
+    def flush(self, ip=None, port_info=None):
+        if self.pending or port_info:
+            _progress_queue.put((self.pending, ip, port_info))
+            self.pending = 0
+
+
+def _run_shard(host_ports, control, stages, fingerprint_enabled, seeds, retry, deadline, rates):
+    progress = _ShardProgress()
+    # Tiap shard punya jendela AIMD dan anggaran FD proses sendiri
+    controller = ConcurrencyController(**control)
+    pipeline = FingerprintPipeline(**stages)
+    timings = {ip: RttEstimator.from_seed(seed, controller) for ip, seed in seeds.items()}
+    # Pacer tidak bisa dibagi antar proses, tiap shard dapat porsi dari sewaan parent
+    pacing = ScanPacing.for_shard(rates) if rates else None
+    # time.monotonic() di Linux berlaku untuk semua proses, deadline bisa dipakai langsung
+    scheduler = TargetScheduler(host_ports, controller.limit, progress, retry,
+                                deadline=deadline, pacing=pacing, controller=controller, pipeline=pipeline)
+    results = run_async_scan(scheduler, fingerprint_enabled, timings)
+    progress.flush()
+    controller.close()
+    pipeline.close()
+    paced = (pacing.probes, pacing.throttled) if pacing else None
+    return (results, scheduler.dispatched, paced,
+            {ip: timing.shard_state() for ip, timing in timings.items()}, controller.snapshot(),
+            pipeline.state())
+
+
+def _drain_progress(progress_queue, progress, retry):
+    while True:
+        try:
+            done_count, ip, port_info = progress_queue.get_nowait()
+        except queue.Empty:
+            return
+        if progress is None:
+            continue
+        if not retry:
+            for _ in range(done_count):
+                progress.probe_done(ip, None)
+        if port_info:
+            progress.probe_done(ip, port_info, counted=False)
+
+
+def _checkpoint_shard(checkpoint, shard, dispatched, results):
+    """Mark a finished shard's probed ports done; a shard reports only when it ends"""
+    found = {(ip, port_info["port"]): port_info for ip, port_info in results}
+    for ip, ports in shard:
+        # Port setelah deadline tidak pernah dikirim, jangan ditandai selesai
+        for port in ports[:dispatched.get(ip, 0)]:
+            checkpoint.mark(ip, port, found.get((ip, port)))
+
+
+def run_sharded_scan(scheduler, fingerprint_enabled, timings, processes=SHARD_DEFAULT_PROCESSES):
+    """Split the scheduler's probes across worker processes and merge their results"""
+    processes = max(1, min(int(processes), SHARD_MAX_PROCESSES))
+    shards = scheduler.shard(processes)
+    if not shards:
+        return []
+
+    seeds = {ip: timing.seed_state() for ip, timing in timings.items()}
+    if scheduler.controller:
+        control = scheduler.controller.shard_spec(len(shards))
+    else:
+        control = {"initial": scheduler.concurrency, "ceiling": scheduler.concurrency,
+                   "floor": scheduler.concurrency}
+    pipeline = scheduler.pipeline or FingerprintPipeline.event_loop()
+    stages = pipeline.shard_spec(len(shards))
+    if pipeline is not scheduler.pipeline:
+        pipeline.close()
+    pacing = scheduler.pacing
+    # Porsi shard diambil dari anggaran global proses selama shard berjalan
+    rates = pacing.lease_shards(len(shards), list(seeds)) if pacing else None
+    try:
+        return _run_shards(scheduler, shards, control, stages, fingerprint_enabled, timings, seeds, rates)
+    finally:
+        if pacing:
+            pacing.release_shards()
+
+
+def _run_shards(scheduler, shards, control, stages, fingerprint_enabled, timings, seeds, rates):
+    pacing = scheduler.pacing
+    # spawn: proses Flask sudah punya banyak thread, fork tidak aman
+    context = multiprocessing.get_context("spawn")
+    progress_queue = context.Queue()
+    results = []
+
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context,
+                             initializer=_init_worker, initargs=(progress_queue,)) as executor:
+        pending = {executor.submit(_run_shard, shard, control, stages, fingerprint_enabled,
+                                   {ip: seeds[ip] for ip, _ in shard}, scheduler.retry,
+                                   scheduler.deadline, rates): shard
+                   for shard in shards}
+        while pending:
+            done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            _drain_progress(progress_queue, scheduler.progress, scheduler.retry)
+            for future in done:
+                shard = pending.pop(future)
+                (shard_results, shard_dispatched, paced, shard_states, control_stats,
+                 pipeline_stats) = future.result()
+                results.extend(shard_results)
+                if paced:
+                    pacing.merge_shard(*paced)
+                for ip, count in shard_dispatched.items():
+                    scheduler.dispatched[ip] += count
+                if scheduler.checkpoint:
+                    _checkpoint_shard(scheduler.checkpoint, shard, shard_dispatched, shard_results)
+                for ip, state in shard_states.items():
+                    timings[ip].merge_shard(state)
+                if scheduler.controller:
+                    scheduler.controller.merge_shard(control_stats)
+                if scheduler.pipeline:
+                    scheduler.pipeline.merge_shard(pipeline_stats)
+
+    _drain_progress(progress_queue, scheduler.progress, scheduler.retry)
+    return results
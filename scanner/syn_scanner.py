@@ -0,0 +1,150 @@
+import os
+import random
+import socket
+import struct
+import threading
+
+from .port_state import CLOSED, FILTERED, OPEN
+from .prober import Prober, RECV_BUFFER_SIZE
+
+# Half-open SYN scan memakai raw socket (butuh root / CAP_NET_RAW)
+SYN_TIMEOUT = 1.0
+SYN_RETRIES = 1
+
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_ACK = 0x10
+
+
+def has_raw_socket_capability():
+    """Check whether this process may open raw TCP sockets (CAP_NET_RAW)"""
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+        s.close()
+        return True
+    except OSError:
+        return False
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack('!%dH' % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def _source_ip_for(target_ip):
+    """Pick the local address the kernel would route to target_ip from, None when there is no route"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        try:
+            s.connect((target_ip, 9))
+        except OSError:
+            # ENETUNREACH, EACCES untuk broadcast, ...: host tidak bisa dijangkau sama sekali
+            return None
+        return s.getsockname()[0]
+
+
+def build_syn_packet(src_ip, dst_ip, src_port, dst_port, seq):
+    """Build a bare TCP SYN header with a valid checksum (kernel adds the IP header)"""
+    offset_flags = (5 << 12) | TCP_SYN
+    header = struct.pack('!HHIIHHHH', src_port, dst_port, seq, 0, offset_flags, 1024, 0, 0)
+    pseudo = struct.pack('!4s4sBBH', socket.inet_aton(src_ip), socket.inet_aton(dst_ip),
+                         0, socket.IPPROTO_TCP, len(header))
+    checksum = _checksum(pseudo + header)
+    return header[:16] + struct.pack('!H', checksum) + header[18:]
+
+
+class SynScanner(Prober):
+    """Pipelined SYN sender with a receiver thread matching replies by sequence number"""
+
+    def __init__(self, timeout=SYN_TIMEOUT, retries=SYN_RETRIES, pacing=None):
+        super().__init__(timeout, retries, pacing)
+        self.src_port = random.randint(40000, 60000)
+        # Secret per scan supaya balasan palsu/lama tidak ikut terhitung
+        self.secret = struct.unpack('!I', os.urandom(4))[0]
+        self.src_ips = {}
+
+    def sequence_for(self, ip, port):
+        ip_value = struct.unpack('!I', socket.inet_aton(ip))[0]
+        return (self.secret ^ (port * 2654435761) ^ (ip_value * 40503)) & 0xffffffff
+
+    def _receive(self, sock):
+        while not self.stop_event.is_set():
+            try:
+                packet = sock.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            ihl = (packet[0] & 0x0f) * 4
+            if len(packet) < ihl + 20:
+                continue
+            ip = socket.inet_ntoa(packet[12:16])
+            states = self.states.get(ip)
+            if states is None:
+                continue
+            src_port, dst_port, _, ack, offset_flags = struct.unpack(
+                '!HHIIH', packet[ihl:ihl + 14])
+            if dst_port != self.src_port:
+                continue
+            # Balasan sah harus meng-ACK sequence yang kita kirim ke port itu
+            if (ack - 1) & 0xffffffff != self.sequence_for(ip, src_port):
+                continue
+
+            flags = offset_flags & 0x3f
+            if flags & TCP_SYN and flags & TCP_ACK:
+                state = OPEN
+            elif flags & TCP_RST:
+                state = CLOSED
+            else:
+                continue
+            with self.lock:
+                # Jawaban pertama yang dihitung, duplikat dan port yang tidak diprobe diabaikan
+                if states.get(src_port) == FILTERED:
+                    states.set(src_port, state)
+                    self._answered(ip, src_port)
+
+    def _send(self, sock, probes):
+        for ip, port in probes:
+            if ip not in self.src_ips:
+                self.src_ips[ip] = _source_ip_for(ip)
+            if self.src_ips[ip] is None:
+                self._give_up(ip, port, host_down=True)
+            # Host tanpa route atau yang ditolak kernel (EHOSTUNREACH, ...) tidak dikirimi lagi
+            if ip in self.unreachable:
+                continue
+            packet = build_syn_packet(self.src_ips[ip], ip, self.src_port,
+                                      port, self.sequence_for(ip, port))
+            if self.pacing:
+                self.pacing.wait(ip)
+            self._sendto(sock, packet, (ip, 0), ip, port)
+
+    def scan(self, probes):
+        """Return {ip: PortStateMap} with every probe open, closed or filtered"""
+        send_sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+        recv_sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+        # Di loopback SYN kita ikut terbaca, jadi buffer harus cukup besar
+        recv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
+        recv_sock.settimeout(0.1)
+        receiver = threading.Thread(target=self._receive, args=(recv_sock,), daemon=True)
+        receiver.start()
+        try:
+            self._send_rounds(lambda probes: self._send(send_sock, probes), probes)
+        finally:
+            self.stop_event.set()
+            receiver.join()
+            send_sock.close()
+            recv_sock.close()
+
+        return self.states
+
+
+def run_syn_scan(probes, timeout=SYN_TIMEOUT, retries=SYN_RETRIES, pacing=None):
+    """Half-open scan of (ip, port) probes, returns ([(ip, port)] open, {ip: PortStateMap}, {unreachable ips})"""
+    scanner = SynScanner(timeout, retries, pacing)
+    states = scanner.scan(probes)
+    open_probes = [(ip, port) for ip, host_states in states.items() for port, _ in host_states.ports(OPEN)]
+    return open_probes, states, scanner.unreachable
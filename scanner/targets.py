@@ -0,0 +1,208 @@
+import ipaddress
+import time
+from array import array
+from collections import deque
+
+# Batas jumlah host per scan (/20)
+MAX_TARGETS = 4096
+
+
+class TargetError(ValueError):
+    pass
+
+
+def _expand_range(token):
+    """Expand 10.0.0.1-10.0.0.20 or the short form 10.0.0.1-20"""
+    first, last = token.split('-', 1)
+    start = ipaddress.IPv4Address(first.strip())
+    last = last.strip()
+    if '.' not in last:
+        last = first.rsplit('.', 1)[0] + '.' + last
+    end = ipaddress.IPv4Address(last)
+    if end < start:
+        raise TargetError(f"Invalid range '{token}'")
+    if int(end) - int(start) + 1 > MAX_TARGETS:
+        raise TargetError(f"Range '{token}' has more than {MAX_TARGETS} hosts")
+    return [str(ipaddress.IPv4Address(i)) for i in range(int(start), int(end) + 1)]
+
+
+def _expand_token(token):
+    if '/' in token:
+        try:
+            network = ipaddress.ip_network(token, strict=False)
+        except ValueError:
+            raise TargetError(f"Invalid CIDR block '{token}'")
+        if network.num_addresses > MAX_TARGETS:
+            raise TargetError(f"CIDR block '{token}' has more than {MAX_TARGETS} hosts")
+        # /31 dan /32 tidak punya alamat network/broadcast
+        hosts = list(network.hosts()) or [network.network_address]
+        return [str(host) for host in hosts]
+
+    if '-' in token:
+        try:
+            return _expand_range(token)
+        except ipaddress.AddressValueError:
+            pass  # Hostname yang mengandung '-', bukan range
+
+    return [token]
+
+
+def parse_targets(spec):
+    """Expand a target spec (CIDR, range, hostname or a list of them) into hosts"""
+    if isinstance(spec, str):
+        tokens = spec.replace(',', ' ').split()
+    else:
+        tokens = [str(item).strip() for item in spec]
+
+    hosts = []
+    seen = set()
+    for token in tokens:
+        if not token:
+            continue
+        for host in _expand_token(token):
+            if host not in seen:
+                seen.add(host)
+                hosts.append(host)
+        if len(hosts) > MAX_TARGETS:
+            raise TargetError(f"Too many targets, maximum is {MAX_TARGETS}")
+    return hosts
+
+
+class TargetScheduler:
+    """Round-robin (host, port) probes so one slow host cannot hold every slot"""
+
+    def __init__(self, host_ports, concurrency, progress=None, retry=False, on_open=None,
+                 deadline=None, pacing=None, checkpoint=None, controller=None, pipeline=None):
+        # host_ports: list of (ip, iterable of ports)
+        self.active = deque((ip, iter(ports)) for ip, ports in host_ports)
+        self.in_flight = {ip: 0 for ip, _ in host_ports}
+        self.dispatched = {ip: 0 for ip, _ in host_ports}
+        self.fixed_concurrency = max(1, concurrency)
+        self.progress = progress
+        # Probe ulang tidak menambah ports_done, port sudah terhitung di pass pertama
+        self.retry = retry
+        # on_open(ip, port_info) memberi umpan balik ke traversal adaptif
+        self.on_open = on_open
+        # Batas waktu (time.monotonic), setelahnya tidak ada probe baru
+        self.deadline = deadline
+        # ScanPacing bersama, None = tanpa pembatasan laju
+        self.pacing = pacing
+        # ScanCheckpoint yang mencatat probe selesai, None = tanpa checkpoint
+        self.checkpoint = checkpoint
+        # ConcurrencyController yang menggeser batas in-flight, None = tetap di concurrency
+        self.controller = controller
+        # FingerprintPipeline tempat port terbuka menunggu banner, None = dibuat oleh engine
+        self.pipeline = pipeline
+        # Host yang ternyata tidak punya route sama sekali (raw scanner)
+        self.unreachable = set()
+
+    @property
+    def concurrency(self):
+        """Probes allowed in flight right now"""
+        return self.controller.limit if self.controller else self.fixed_concurrency
+
+    @property
+    def max_concurrency(self):
+        """Upper bound the window can grow to, for sizing worker pools"""
+        return self.controller.ceiling if self.controller else self.fixed_concurrency
+
+    @property
+    def exhausted(self):
+        return not self.active
+
+    @property
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def per_host_limit(self):
+        # Jatah dibagi rata di antara host yang masih punya port tersisa
+        return max(1, -(-self.concurrency // max(1, len(self.active))))
+
+    def next_probe(self):
+        """Next dispatchable (ip, port), or None when every host is at its limit"""
+        if self.expired:
+            return None
+        limit = self.per_host_limit()
+        for _ in range(len(self.active)):
+            ip, ports = self.active[0]
+            if self.in_flight[ip] >= limit:
+                self.active.rotate(-1)
+                continue
+            port = next(ports, None)
+            if port is None:
+                self.active.popleft()
+                continue
+            self.active.rotate(-1)
+            self.in_flight[ip] += 1
+            self.dispatched[ip] += 1
+            return ip, port
+        return None
+
+    def pace(self, ip):
+        """Seconds to wait before sending the probe just taken for ip"""
+        return self.pacing.delay(ip) if self.pacing else 0
+
+    def done(self, ip, port, port_info=None):
+        self.release(ip, port_info)
+        self.finish(ip, port, port_info)
+
+    def release(self, ip, port_info=None):
+        """Free the probe's connect slot; port_info when it answered open and may still be fingerprinting"""
+        self.in_flight[ip] -= 1
+        # Traversal adaptif mempromosikan port terkait saat connect berhasil, tidak menunggu banner
+        if port_info and self.on_open:
+            self.on_open(ip, port_info)
+
+    def finish(self, ip, port, port_info=None):
+        """Checkpoint and progress bookkeeping for a probe whose connect slot was already released"""
+        if self.checkpoint:
+            self.checkpoint.mark(ip, port, port_info)
+        if self.progress:
+            self.progress.probe_done(ip, port_info, counted=not self.retry)
+
+    def found(self, ip, port_info):
+        """Report an open port confirmed after its probe was already marked done"""
+        if self.checkpoint:
+            self.checkpoint.add_result(ip, port_info)
+        if self.on_open:
+            self.on_open(ip, port_info)
+        if self.progress:
+            self.progress.probe_done(ip, port_info, counted=False)
+
+    def record(self, states):
+        """Checkpoint the closed and filtered ports of {ip: PortStateMap} from a raw scanner"""
+        if not self.checkpoint:
+            return
+        for ip, host_states in states.items():
+            self.checkpoint.mark_states(ip, host_states)
+
+    def shard(self, count):
+        """Deal the remaining ports of every host round-robin into count shards"""
+        shards = [[] for _ in range(count)]
+        for ip, ports in self.active:
+            # array('H') = 2 byte per port, ringan di-pickle ke proses shard
+            host_shards = [array('H') for _ in range(count)]
+            for index, port in enumerate(ports):
+                host_shards[index % count].append(port)
+            for shard, shard_ports in zip(shards, host_shards):
+                if shard_ports:
+                    shard.append((ip, shard_ports))
+        self.active.clear()
+        return [shard for shard in shards if shard]
+
+    def drain(self):
+        """Yield every probe in interleaved order without in-flight accounting
+
+        The checkpoint is left alone: the raw scanner only knows a port's state once
+        the answers are in, and reports it through record() and found().
+        """
+        while self.active:
+            probe = self.next_probe()
+            if probe is None:
+                if self.expired:
+                    return
+                continue
+            self.release(probe[0])
+            if self.progress:
+                self.progress.probe_done(probe[0], None, counted=not self.retry)
+            yield probe
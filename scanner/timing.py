@@ -0,0 +1,178 @@
+import threading
+
+from utils.metrics import HistogramData, LATENCY_BUCKETS, BANNER_BUCKETS
+
+# Timeout awal sebelum ada sampel RTT dari target
+CONNECT_TIMEOUT = 0.5
+BANNER_TIMEOUT = 2
+
+MIN_CONNECT_TIMEOUT = 0.05
+MAX_CONNECT_TIMEOUT = 5.0
+MIN_BANNER_TIMEOUT = 0.5
+MAX_BANNER_TIMEOUT = 5.0
+
+# Banner butuh waktu proses di server, bukan hanya satu RTT
+BANNER_RTT_FACTOR = 6
+
+# Respons dianggap cepat untuk pengendali concurrency kalau RTT <= min RTT * faktor + slack
+FAST_RTT_FACTOR = 3.0
+FAST_RTT_SLACK = 0.005
+
+DEFAULT_RETRIES = 1
+MAX_RETRIES = 3
+
+
+def _clamp(value, low, high):
+    return max(low, min(value, high))
+
+
+class RttEstimator:
+    """Per-target smoothed RTT (Jacobson/Karels) driving connect and banner timeouts"""
+
+    def __init__(self, max_retries=DEFAULT_RETRIES, controller=None):
+        self.max_retries = _clamp(int(max_retries), 0, MAX_RETRIES)
+        self.srtt = None
+        self.rttvar = None
+        self.min_rtt = None
+        # ConcurrencyController scan ini, diberi tahu setiap jawaban, timeout dan error lokal
+        self.controller = controller
+        self.samples = 0
+        self.retry_floor = 0
+        self.timed_out = []
+        self.retried = 0
+        # Distribusi RTT connect dan lama baca banner, dilaporkan per scan dan ke /metrics
+        self.connect_latency = HistogramData(LATENCY_BUCKETS)
+        self.banner_read = HistogramData(BANNER_BUCKETS)
+        self.lock = threading.Lock()
+
+    def observe(self, rtt, refused=False):
+        """Feed one connect round-trip (SYN-ACK or RST) measured in seconds"""
+        with self.lock:
+            self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+            fast = rtt <= self.min_rtt * FAST_RTT_FACTOR + FAST_RTT_SLACK
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+                self.srtt = 0.875 * self.srtt + 0.125 * rtt
+            self.samples += 1
+            self.connect_latency.observe(rtt)
+        if self.controller:
+            self.controller.on_response(fast, refused)
+
+    def observe_banner(self, seconds):
+        """Feed the time spent reading one banner (including probes sent to provoke it)"""
+        with self.lock:
+            self.banner_read.observe(seconds)
+
+    def record_timeout(self, port):
+        with self.lock:
+            self.timed_out.append(port)
+        if self.controller:
+            self.controller.on_timeout()
+
+    def record_resource_error(self, port):
+        """The probe could not be sent (EMFILE, ENOBUFS, ...), queue it for the retry pass"""
+        with self.lock:
+            self.timed_out.append(port)
+        if self.controller:
+            self.controller.on_resource_error()
+
+    def unanswered(self):
+        """Ports still without an answer, left for the caller to report as filtered"""
+        with self.lock:
+            return list(self.timed_out)
+
+    def pop_timeouts(self):
+        with self.lock:
+            ports, self.timed_out = self.timed_out, []
+            return ports
+
+    def back_off(self, retry_count):
+        """Start a retry round: double the timeout floor for ports that timed out"""
+        with self.lock:
+            self.retry_floor = _clamp(max(self.retry_floor, self._connect_timeout()) * 2,
+                                      MIN_CONNECT_TIMEOUT, MAX_CONNECT_TIMEOUT)
+            self.retried += retry_count
+
+    def _connect_timeout(self):
+        if self.srtt is None:
+            timeout = CONNECT_TIMEOUT
+        else:
+            timeout = self.srtt + 4 * self.rttvar
+        return _clamp(max(timeout, self.retry_floor), MIN_CONNECT_TIMEOUT, MAX_CONNECT_TIMEOUT)
+
+    def connect_timeout(self):
+        with self.lock:
+            return self._connect_timeout()
+
+    def banner_timeout(self):
+        with self.lock:
+            if self.srtt is None:
+                return BANNER_TIMEOUT
+            return _clamp(self._connect_timeout() * BANNER_RTT_FACTOR,
+                          MIN_BANNER_TIMEOUT, MAX_BANNER_TIMEOUT)
+
+    def seed_state(self):
+        """Current estimate without sample history, to seed a shard in another process"""
+        with self.lock:
+            return {
+                "max_retries": self.max_retries,
+                "srtt": self.srtt,
+                "rttvar": self.rttvar,
+                "retry_floor": self.retry_floor
+            }
+
+    @classmethod
+    def from_seed(cls, seed, controller=None):
+        estimator = cls(seed["max_retries"], controller)
+        estimator.srtt = seed["srtt"]
+        estimator.rttvar = seed["rttvar"]
+        estimator.retry_floor = seed["retry_floor"]
+        return estimator
+
+    def shard_state(self):
+        """Samples and timeouts collected by a shard, merged back with merge_shard"""
+        with self.lock:
+            return {
+                "srtt": self.srtt,
+                "rttvar": self.rttvar,
+                "samples": self.samples,
+                "timed_out": list(self.timed_out),
+                "connect_latency": self.connect_latency.state(),
+                "banner_read": self.banner_read.state()
+            }
+
+    def merge_shard(self, state):
+        with self.lock:
+            self.timed_out.extend(state["timed_out"])
+            self.connect_latency.merge(state["connect_latency"])
+            self.banner_read.merge(state["banner_read"])
+            if not state["samples"]:
+                return
+            if self.srtt is None or not self.samples:
+                self.srtt = state["srtt"]
+                self.rttvar = state["rttvar"]
+            else:
+                # Rata-rata berbobot jumlah sampel dari tiap shard
+                total = self.samples + state["samples"]
+                self.srtt = (self.srtt * self.samples + state["srtt"] * state["samples"]) / total
+                self.rttvar = (self.rttvar * self.samples + state["rttvar"] * state["samples"]) / total
+            self.samples += state["samples"]
+
+    def snapshot(self):
+        """Timeouts chosen for the scan, reported in the /scan response"""
+        connect_timeout = self.connect_timeout()
+        banner_timeout = self.banner_timeout()
+        with self.lock:
+            return {
+                "srtt_ms": round(self.srtt * 1000, 3) if self.srtt is not None else None,
+                "rttvar_ms": round(self.rttvar * 1000, 3) if self.rttvar is not None else None,
+                "rtt_samples": self.samples,
+                "connect_timeout": round(connect_timeout, 3),
+                "banner_timeout": round(banner_timeout, 3),
+                "max_retries": self.max_retries,
+                "retried_ports": self.retried,
+                "unanswered_ports": len(self.timed_out)
+            }
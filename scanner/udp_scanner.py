@@ -0,0 +1,216 @@
+import os
+import select
+import socket
+import struct
+import sys
+import threading
+
+from .pacing import ScanPacing
+from .port_state import UNPROBED, CLOSED, FILTERED, OPEN
+from .prober import Prober, RECV_BUFFER_SIZE
+
+# UDP tidak punya handshake: port terbuka hanya terlihat dari balasan aplikasi
+UDP_TIMEOUT = 1.5
+UDP_RETRIES = 1
+UDP_SOCKETS = 4
+
+# Probe per detik; ICMP unreachable dibatasi kernel target, terlalu cepat = hasil palsu
+UDP_DEFAULT_RATE = 500
+UDP_MAX_RATE = 10000
+
+# Linux: error ICMP dibaca lewat error queue socket (ip(7), IP_RECVERR)
+IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+MSG_ERRQUEUE = getattr(socket, "MSG_ERRQUEUE", 0x2000)
+SO_EE_ORIGIN_ICMP = 2
+ICMP_DEST_UNREACH = 3
+ICMP_PORT_UNREACH = 3
+
+UDP_SERVICES = {
+    53: 'DNS',
+    69: 'TFTP',
+    123: 'NTP',
+    137: 'NetBIOS-NS',
+    161: 'SNMP',
+    500: 'IKE',
+    1900: 'SSDP',
+    5353: 'mDNS'
+}
+
+
+def _dns_query():
+    """version.bind CH TXT, answered (or refused) by almost every DNS server"""
+    header = struct.pack('!HHHHHH', struct.unpack('!H', os.urandom(2))[0], 0, 1, 0, 0, 0)
+    return header + b'\x07version\x04bind\x00' + struct.pack('!HH', 16, 3)
+
+
+UDP_PAYLOADS = {
+    53: _dns_query(),
+    5353: _dns_query(),
+    # NTP v3 client request
+    123: b'\x1b' + b'\x00' * 47,
+    # NetBIOS NBSTAT untuk nama '*'
+    137: b'\x80\xf0\x00\x00\x00\x01\x00\x00\x00\x00\x00\x00'
+         b'\x20CKAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA\x00\x00\x21\x00\x01',
+    # SNMPv2c get-request sysDescr.0, community "public"
+    161: b'\x30\x29\x02\x01\x01\x04\x06public\xa0\x1c\x02\x04\x53\x45\x4e\x41'
+         b'\x02\x01\x00\x02\x01\x00\x30\x0e\x30\x0c\x06\x08\x2b\x06\x01\x02'
+         b'\x01\x01\x01\x00\x05\x00',
+    1900: b'M-SEARCH * HTTP/1.1\r\nHOST: 239.255.255.250:1900\r\n'
+          b'MAN: "ssdp:discover"\r\nMX: 1\r\nST: ssdp:all\r\n\r\n',
+    # TFTP read request, file yang hampir pasti tidak ada (balasan error pun cukup)
+    69: b'\x00\x01sena-probe\x00octet\x00'
+}
+
+
+def has_icmp_errors():
+    """ICMP unreachable is only visible through IP_RECVERR on Linux"""
+    return sys.platform.startswith("linux")
+
+
+def describe_response(port, data):
+    """Short human-readable summary of a UDP reply, used as the port's banner"""
+    if port in (53, 5353) and len(data) >= 12:
+        flags, _, answers = struct.unpack('!HHH', data[2:8])
+        return f"DNS response rcode={flags & 0x0f} answers={answers}"
+    if port == 123 and len(data) >= 48:
+        return f"NTP v{(data[0] >> 3) & 0x07} stratum {data[1]}"
+    # SNMP/SSDP/lainnya: ambil teks yang bisa dibaca
+    text = ''.join(chr(b) if 32 <= b < 127 else ' ' for b in data[:200])
+    return ' '.join(text.split())[:100] or f"{len(data)} bytes"
+
+
+class UdpScanner(Prober):
+    """Paced UDP prober over a few shared sockets, correlating replies and ICMP errors"""
+
+    # sendto sekali melaporkan error ICMP tertunda milik probe lain (ECONNREFUSED, ...)
+    deferred_send_errors = True
+
+    def __init__(self, timeout=UDP_TIMEOUT, retries=UDP_RETRIES, pacing=None,
+                 socket_count=UDP_SOCKETS):
+        super().__init__(timeout, retries, pacing or ScanPacing(rate=UDP_DEFAULT_RATE))
+        self.socket_count = max(1, socket_count)
+        # ICMP filtered sudah dijawab, tidak dikirim ulang; biasanya hanya segelintir port
+        self.icmp_filtered = set()
+        self.responses = {}
+
+    def _open_sockets(self):
+        sockets = []
+        for _ in range(self.socket_count):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
+            if has_icmp_errors():
+                sock.setsockopt(socket.IPPROTO_IP, IP_RECVERR, 1)
+            sock.setblocking(False)
+            sock.bind(('', 0))
+            sockets.append(sock)
+        return sockets
+
+    def _record(self, probe, state, data=None):
+        ip, port = probe
+        with self.lock:
+            states = self.states.get(ip)
+            current = states.get(port) if states is not None else UNPROBED
+            # Hanya port yang diprobe; balasan aplikasi mengalahkan ICMP yang datang belakangan
+            if current in (UNPROBED, OPEN):
+                return
+            if current == FILTERED:
+                self._answered(ip, port)
+            if state == FILTERED:
+                self.icmp_filtered.add(probe)
+            else:
+                self.icmp_filtered.discard(probe)
+            states.set(port, state)
+            if data is not None:
+                self.responses[probe] = data
+
+    def _read_errors(self, sock):
+        while True:
+            try:
+                _, ancdata, _, address = sock.recvmsg(512, 512, MSG_ERRQUEUE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            for level, kind, data in ancdata:
+                if level != socket.IPPROTO_IP or kind != IP_RECVERR or len(data) < 16:
+                    continue
+                _, origin, icmp_type, icmp_code = struct.unpack('=IBBB', data[:7])
+                if origin != SO_EE_ORIGIN_ICMP or icmp_type != ICMP_DEST_UNREACH:
+                    continue
+                # msg_name berisi tujuan asli paket yang ditolak
+                state = CLOSED if icmp_code == ICMP_PORT_UNREACH else FILTERED
+                self._record(address[:2], state)
+
+    def _read_replies(self, sock):
+        for _ in range(1024):
+            try:
+                data, address = sock.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # Error ICMP tertunda dilaporkan sekali lewat recv, detailnya di error queue
+                continue
+            self._record(address[:2], OPEN, data)
+
+    def _receive(self, sockets):
+        while not self.stop_event.is_set():
+            readable, _, errored = select.select(sockets, [], sockets, 0.1)
+            for sock in set(readable) | set(errored):
+                if has_icmp_errors():
+                    self._read_errors(sock)
+                self._read_replies(sock)
+
+    def _awaited(self, ip, port):
+        return (ip, port) not in self.icmp_filtered and super()._awaited(ip, port)
+
+    def _send(self, sockets, probes):
+        for ip, port in probes:
+            # Probe host yang tidak bisa dijangkau tidak pernah ditunggu
+            if ip in self.unreachable:
+                continue
+            self.pacing.wait(ip)
+            # Probe yang sama selalu lewat socket yang sama
+            sock = sockets[hash((ip, port)) % len(sockets)]
+            self._sendto(sock, UDP_PAYLOADS.get(port, b''), (ip, port), ip, port)
+
+    def _slow_down(self):
+        # Diam bisa berarti ICMP target kena rate limit, ulangi lebih pelan
+        self.pacing.scale_rate(0.5)
+
+    def scan(self, probes):
+        """Return {ip: PortStateMap}; FILTERED without an ICMP error is nmap's open|filtered"""
+        sockets = self._open_sockets()
+        receiver = threading.Thread(target=self._receive, args=(sockets,), daemon=True)
+        receiver.start()
+        try:
+            self._send_rounds(lambda probes: self._send(sockets, probes), probes)
+        finally:
+            self.stop_event.set()
+            receiver.join()
+            for sock in sockets:
+                sock.close()
+
+        return self.states
+
+
+def run_udp_scan(probes, pacing=None, fingerprint_enabled=True,
+                 timeout=UDP_TIMEOUT, retries=UDP_RETRIES):
+    """UDP scan of (ip, port) probes, returns ([(ip, port_info)] that answered, {ip: PortStateMap}, {unreachable ips})"""
+    scanner = UdpScanner(timeout, retries, pacing)
+    states = scanner.scan(probes)
+    results = []
+    for ip, host_states in states.items():
+        for port, _ in host_states.ports(OPEN):
+            results.append((ip, _udp_port_info(port, scanner.responses.get((ip, port), b''),
+                                               fingerprint_enabled)))
+    return results, states, scanner.unreachable
+
+
+def _udp_port_info(port, data, fingerprint_enabled):
+    return {
+        "port": port,
+        "protocol": "udp",
+        "status": "open",
+        "service": UDP_SERVICES.get(port, 'Unknown'),
+        "banner": describe_response(port, data) if fingerprint_enabled else None
+    }
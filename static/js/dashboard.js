@@ -289,7 +289,8 @@
         const ip = document.getElementById('ip').value.trim();
         const mode = document.getElementById('mode').value;
         const traversal = document.getElementById('traversal').value;
-        const threads = parseInt(document.getElementById('threads').value);
+        // Kosong = concurrency diatur otomatis oleh scanner
+        const threads = parseInt(document.getElementById('threads').value) || null;
         const outputElement = document.getElementById('output');
         const loadingElement = document.getElementById('loading');
         const scanButton = document.querySelector('button[onclick="startScan()"]');
@@ -300,12 +301,12 @@
             return;
         }
         
-        if (!isValidIP(ip)) {
-            showNotification('Please enter a valid IP address', 'error');
+        if (!isValidTargetSpec(ip)) {
+            showNotification('Please enter a valid IP address, CIDR block or range', 'error');
             return;
         }
         
-        if (threads < 1 || threads > 1000) {
+        if (threads !== null && (threads < 1 || threads > 1000)) {
             showNotification('Thread count must be between 1 and 1000', 'error');
             return;
         }
@@ -329,8 +330,8 @@
         currentScan = scanConfig;
         
         try {
-            // Make real API call to backend
-            const response = await fetch('http://localhost:5000/scan', {
+            // Stream open ports and progress while the scan runs
+            const response = await fetch('http://localhost:5000/scan/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -341,14 +342,19 @@
                     end_port: 1024,
                     mode: mode,
                     traversal: traversal,
-                    threads: threads,
+                    threads: threads || undefined,
                     fingerprint: true
                 })
             });
 
-            const result = await response.json();
+            if (!response.ok) {
+                const error = await response.json();
+                throw new Error(error.error || "Unknown error occurred");
+            }
+
+            const result = await readScanStream(response, outputElement);
 
-            if (response.ok) {
+            if (result.status === 'completed') {
                 // Complete scan with real results
                 scanConfig.endTime = new Date();
                 scanConfig.duration = result.scan_duration;
@@ -385,6 +391,40 @@
         }
     }
 
+    async function readScanStream(response, outputElement) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const foundLines = [];
+        let progressLine = '🔎 Scanning in progress...';
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // One JSON frame per line (NDJSON)
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const frame = JSON.parse(line);
+
+                if (frame.type === 'port') {
+                    foundLines.push(`🟢 ${frame.host}:${frame.port} ${frame.service}${frame.banner ? ` - ${frame.banner}` : ''}`);
+                } else if (frame.type === 'progress') {
+                    progressLine = `🔎 Scanning in progress... ${frame.ports_done}/${frame.ports_total} ports (${frame.percent}%), ${frame.open_so_far} open so far`;
+                } else if (frame.type === 'summary') {
+                    return frame;
+                } else if (frame.type === 'error') {
+                    throw new Error(frame.error);
+                }
+                outputElement.textContent = [progressLine, ...foundLines].join('\n');
+            }
+        }
+        throw new Error('Scan stream ended unexpectedly');
+    }
+
     // =====================================
     // HISTORY MANAGEMENT
     // =====================================
@@ -571,7 +611,7 @@
                             <p><span class="text-gray-400">Target IP:</span> <span class="font-mono text-blue-400">${scan.ip}</span></p>
                             <p><span class="text-gray-400">Scan Mode:</span> <span class="uppercase">${scan.mode}</span></p>
                             <p><span class="text-gray-400">Traversal:</span> <span class="uppercase">${scan.traversal}</span></p>
-                            <p><span class="text-gray-400">Threads:</span> ${scan.threads}</p>
+                            <p><span class="text-gray-400">Threads:</span> ${scan.threads || 'Auto'}</p>
                             <p><span class="text-gray-400">Duration:</span> ${scan.duration || 'N/A'}s</p>
                             <p><span class="text-gray-400">Status:</span> <span class="status-${scan.status === 'completed' ? 'success' : scan.status === 'error' ? 'error' : 'warning'}">${scan.status}</span></p>
                         </div>
@@ -730,6 +770,17 @@
         return ipRegex.test(ip);
     }
 
+    // Accepts single IPs, CIDR blocks (10.0.0.0/24), ranges (10.0.0.1-20) and comma lists
+    function isValidTargetSpec(spec) {
+        return spec.split(/[\s,]+/).filter(Boolean).every(token => {
+            const [base, suffix] = token.split(/[\/-]/);
+            if (!isValidIP(base)) return false;
+            if (suffix === undefined) return !/[\/-]/.test(token);
+            if (token.includes('/')) return /^\d+$/.test(suffix) && parseInt(suffix) <= 32;
+            return isValidIP(suffix) || /^\d{1,3}$/.test(suffix);
+        });
+    }
+
     function generateScanId() {
         return 'scan_' + Date.now() + '_' + Math.random().toString(36).substr(2, 9);
     }
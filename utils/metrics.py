@@ -0,0 +1,237 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Batas bucket histogram default (detik), dari koneksi loopback sampai timeout terpanjang
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BANNER_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = ('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+               for key, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+class HistogramData:
+    """Bucket counts without locking, the owner (e.g. RttEstimator) serialises access"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # Satu slot per bucket plus overflow (+Inf), tidak kumulatif
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def state(self):
+        """Picklable copy, to ship from a shard process or merge into a registry histogram"""
+        return {"counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+    def merge(self, state):
+        for index, count in enumerate(state["counts"]):
+            self.counts[index] += count
+        self.sum += state["sum"]
+        self.count += state["count"]
+
+    def cumulative(self):
+        """[(upper bound, observations <= bound)] ending with +Inf"""
+        running = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation, None when empty"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, running in self.cumulative():
+            if running >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        """Compact summary for a scan result"""
+        p50 = self.quantile(0.5)
+        p99 = self.quantile(0.99)
+        return {
+            "count": self.count,
+            "sum_seconds": round(self.sum, 4),
+            "p50_le": _format_value(p50) if p50 is not None else None,
+            "p99_le": _format_value(p99) if p99 is not None else None,
+            "buckets": {_format_value(bound): running for bound, running in self.cumulative()}
+        }
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, func=None):
+        self.name = name
+        self.help = help_text
+        # func() -> value atau {label tuple: value}, dibaca saat scrape
+        self.func = func
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def samples(self):
+        if self.func is not None:
+            value = self.func()
+            return value.items() if isinstance(value, dict) else [((), value)]
+        with self.lock:
+            return list(self.values.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self.samples()):
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[tuple(sorted(labels.items()))] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def _data(self, labels):
+        key = tuple(sorted(labels.items()))
+        data = self.values.get(key)
+        if data is None:
+            data = self.values[key] = HistogramData(self.buckets)
+        return data
+
+    def observe(self, value, **labels):
+        with self.lock:
+            self._data(labels).observe(value)
+
+    def merge(self, state, **labels):
+        """Fold a HistogramData.state() with the same buckets into this histogram"""
+        with self.lock:
+            self._data(labels).merge(state)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = [(labels, data.cumulative(), data.sum, data.count)
+                      for labels, data in sorted(self.values.items())]
+        for labels, cumulative, total, count in series:
+            for bound, running in cumulative:
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            # Modul yang di-import ulang mendapat metrik yang sama, bukan duplikat
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, func=None):
+        return self._register(Counter(name, help_text, func))
+
+    def gauge(self, name, help_text, func=None):
+        return self._register(Gauge(name, help_text, func))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # Satu metrik yang gagal dibaca tidak boleh menggagalkan seluruh scrape
+                continue
+        return '\n'.join(lines) + '\n'
+
+
+class PhaseTimer:
+    """Wall-clock seconds per named phase of one scan"""
+
+    def __init__(self):
+        self.phases = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def snapshot(self):
+        result = {name: round(seconds, 4) for name, seconds in self.phases.items()}
+        result["total"] = round(time.perf_counter() - self.started, 4)
+        return result
+
+
+REGISTRY = MetricsRegistry()
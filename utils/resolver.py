@@ -0,0 +1,180 @@
+import ipaddress
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import dns.exception
+    import dns.resolver
+    import dns.reversename
+except ImportError:  # dnspython opsional, tanpa itu TTL tidak diketahui
+    dns = None
+
+# TTL dari record DNS dipakai apa adanya, tapi dijepit ke rentang ini (detik)
+DNS_MIN_TTL = 5
+DNS_MAX_TTL = 3600
+# TTL kalau resolver sistem (getaddrinfo) yang menjawab, TTL aslinya tidak terlihat
+DNS_DEFAULT_TTL = 300
+# Nama yang gagal di-resolve diingat sebentar supaya tidak ditanya berulang
+DNS_NEGATIVE_TTL = 30
+DNS_CACHE_SIZE = 10000
+DNS_TIMEOUT = 3.0
+DNS_RESOLVE_WORKERS = 32
+
+
+def _clamp_ttl(ttl):
+    return max(DNS_MIN_TTL, min(ttl, DNS_MAX_TTL))
+
+
+def _ip_literal(value):
+    try:
+        return ipaddress.ip_address(value)
+    except ValueError:
+        return None
+
+
+class CachingResolver:
+    """Forward/reverse lookups with a TTL-respecting positive and negative LRU cache"""
+
+    def __init__(self, cache_size=DNS_CACHE_SIZE, timeout=DNS_TIMEOUT):
+        self.cache_size = cache_size
+        self.timeout = timeout
+        # (kind, name) -> (expires_at, value), value None = negatif
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=DNS_RESOLVE_WORKERS,
+                                           thread_name_prefix="dns-resolve")
+        self.dns_resolver = None
+        if dns is not None:
+            try:
+                self.dns_resolver = dns.resolver.Resolver()
+                self.dns_resolver.lifetime = timeout
+            except dns.resolver.NoResolverConfiguration:
+                self.dns_resolver = None
+
+    def _cached(self, key):
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return False, None
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def _store(self, key, value, ttl):
+        with self.lock:
+            self.cache[key] = (time.monotonic() + ttl, value)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def _query(self, host, record_type):
+        """(addresses, ttl) from DNS, ([], None) when the name has no such record"""
+        try:
+            answer = self.dns_resolver.resolve(host, record_type, search=True)
+        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+            return [], None
+        return [record.address for record in answer], answer.rrset.ttl
+
+    def _lookup_dns(self, host):
+        ipv4, ttl4 = self._query(host, 'A')
+        ipv6, ttl6 = self._query(host, 'AAAA')
+        ttls = [ttl for ttl in (ttl4, ttl6) if ttl is not None]
+        return {"ipv4": ipv4, "ipv6": ipv6}, min(ttls) if ttls else None
+
+    def _lookup_system(self, host):
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+        addresses = {"ipv4": [], "ipv6": []}
+        for family, _, _, _, sockaddr in infos:
+            kind = "ipv4" if family == socket.AF_INET else "ipv6" if family == socket.AF_INET6 else None
+            if kind and sockaddr[0] not in addresses[kind]:
+                addresses[kind].append(sockaddr[0])
+        return addresses
+
+    def resolve(self, host):
+        """{"ipv4": [...], "ipv6": [...]} for host, or None when it does not resolve"""
+        literal = _ip_literal(host)
+        if literal is not None:
+            kind = "ipv4" if literal.version == 4 else "ipv6"
+            return dict({"ipv4": [], "ipv6": []}, **{kind: [str(literal)]})
+
+        key = ("forward", host.lower())
+        found, addresses = self._cached(key)
+        if found:
+            return addresses
+
+        ttl = None
+        addresses = None
+        # Nama satu label (localhost, nama intranet) langsung ke resolver sistem
+        if self.dns_resolver is not None and '.' in host.strip('.'):
+            try:
+                addresses, ttl = self._lookup_dns(host)
+            except dns.exception.DNSException:
+                addresses = None
+        # /etc/hosts, mDNS dan nama lokal hanya dikenal resolver sistem
+        if not addresses or not (addresses["ipv4"] or addresses["ipv6"]):
+            try:
+                addresses = self._lookup_system(host)
+                ttl = DNS_DEFAULT_TTL
+            except (socket.gaierror, UnicodeError):
+                addresses = None
+
+        if not addresses or not (addresses["ipv4"] or addresses["ipv6"]):
+            self._store(key, None, DNS_NEGATIVE_TTL)
+            return None
+        self._store(key, addresses, _clamp_ttl(ttl or DNS_DEFAULT_TTL))
+        return addresses
+
+    def resolve_ipv4(self, host):
+        """First IPv4 address of host (what the scanner connects to), or None"""
+        addresses = self.resolve(host)
+        if not addresses or not addresses["ipv4"]:
+            return None
+        return addresses["ipv4"][0]
+
+    def resolve_many(self, hosts):
+        """{host: resolve(host)} with the uncached lookups running in parallel"""
+        hosts = list(dict.fromkeys(hosts))
+        if len(hosts) <= 1:
+            return {host: self.resolve(host) for host in hosts}
+        return dict(zip(hosts, self.executor.map(self.resolve, hosts)))
+
+    def reverse(self, ip):
+        """Hostname for ip (PTR), or None"""
+        key = ("reverse", ip)
+        found, hostname = self._cached(key)
+        if found:
+            return hostname
+
+        ttl = DNS_DEFAULT_TTL
+        hostname = None
+        if self.dns_resolver is not None:
+            try:
+                answer = self.dns_resolver.resolve(dns.reversename.from_address(ip), 'PTR')
+                hostname = str(answer[0].target).rstrip('.')
+                ttl = answer.rrset.ttl
+            except (dns.exception.DNSException, ValueError):
+                hostname = None
+        if hostname is None:
+            try:
+                hostname = socket.gethostbyaddr(ip)[0]
+            except (socket.herror, socket.gaierror, OSError):
+                hostname = None
+
+        if hostname is None:
+            self._store(key, None, DNS_NEGATIVE_TTL)
+        else:
+            self._store(key, hostname, _clamp_ttl(ttl))
+        return hostname
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.cache), "hits": self.hits, "misses": self.misses}
+
+
+RESOLVER = CachingResolver()